@@ -0,0 +1,63 @@
+"""
+Cold-start cost of the proxy: fresh-interpreter import time of the modules
+main() needs before it can serve, plus the slowest imports by -X importtime.
+
+Usage:
+    python benchmarks/bench_cold_start.py [--runs 10] [--top 15]
+"""
+
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+SCENARIOS = {
+    "interpreter": "pass",
+    "config_loader": "import litelitellm.config_loader",
+    "server": "import litelitellm.server",
+    "server+uvicorn": "import litelitellm.server, uvicorn",
+    "server+uvicorn+httpx": "import litelitellm.server, uvicorn, httpx",
+}
+
+
+def _time_run(code: str) -> float:
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", code], cwd=ROOT, check=True)
+    return (time.perf_counter() - start) * 1000.0
+
+
+def _importtime(code: str, top: int) -> list:
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=ROOT, capture_output=True, text=True, check=True)
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        # "import time:  <self us> | <cumulative us> | <indented module name>"
+        self_us, cumulative_us, name = line.split(":", 1)[1].split("|", 2)
+        rows.append((int(cumulative_us), int(self_us), name.rstrip()))
+    rows.sort(reverse=True)
+    return rows[:top]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    print(f"{'scenario':<24}{'median':>10}{'min':>10}")
+    for name, code in SCENARIOS.items():
+        samples = [_time_run(code) for _ in range(args.runs)]
+        print(f"{name:<24}{statistics.median(samples):>8.1f}ms{min(samples):>8.1f}ms")
+
+    print(f"\nslowest imports for {SCENARIOS['server+uvicorn']!r} (cumulative / self):")
+    for cumulative_us, self_us, name in _importtime(SCENARIOS["server+uvicorn"], args.top):
+        print(f"  {cumulative_us / 1000:>8.1f}ms {self_us / 1000:>7.1f}ms  {name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Compression cost vs. transfer savings for request/response bodies.
+
+For a synthetic multi-turn request body and a large non-streaming response it
+reports, per encoding and level: compressed size, CPU time to compress (server
+egress), CPU time to decode through read_request_body (server ingress) and the
+net latency change over a link of the given bandwidth.
+
+Usage:
+    python benchmarks/bench_compression.py [--link-mbps 10] [--turns 40] [--iterations 20]
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from pathlib import Path
+import sys
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from litelitellm.compression import CompressionSettings, read_request_body, response_encodings
+
+
+def _request_body(turns: int) -> bytes:
+    messages = []
+    for i in range(turns):
+        messages.append({"role": "user", "content": [{"type": "text", "text": f"Turn {i}: please refactor module_{i % 7}.py " * 20}]})
+        messages.append({"role": "assistant", "content": [
+            {"type": "text", "text": "Here is the change. " * 30},
+            {"type": "tool_use", "id": f"toolu_{i:04d}", "name": "edit_file",
+             "input": {"path": f"src/module_{i % 7}.py", "content": "def f(x):\n    return x + 1\n" * 40}},
+        ]})
+    tools = [{"name": f"tool_{n}", "description": "Does something useful. " * 10,
+              "input_schema": {"type": "object", "properties": {"path": {"type": "string"}}}} for n in range(25)]
+    return json.dumps({"model": "claude-sonnet-4-5", "max_tokens": 8192, "messages": messages, "tools": tools}).encode()
+
+
+def _response_body() -> bytes:
+    content = [{"type": "text", "text": "The quick brown fox jumps over the lazy dog. " * 400}]
+    content += [{"type": "tool_use", "id": f"toolu_{i}", "name": "write_file", "input": {"content": "x = 1\n" * 300}} for i in range(10)]
+    return json.dumps({"id": "msg_bench", "type": "message", "role": "assistant", "content": content,
+                       "usage": {"input_tokens": 50000, "output_tokens": 8000}}).encode()
+
+
+class _FakeRequest:
+    def __init__(self, data: bytes, encoding: str) -> None:
+        self.headers = {"content-encoding": encoding}
+        self._data = data
+
+    async def body(self) -> bytes:
+        return self._data
+
+    async def stream(self):
+        for i in range(0, len(self._data), 65536):
+            yield self._data[i:i + 65536]
+
+
+def _cpu_ms(fn, iterations: int) -> float:
+    start = time.process_time()
+    for _ in range(iterations):
+        fn()
+    return (time.process_time() - start) * 1000.0 / iterations
+
+
+def _decode_cpu_ms(compressed: bytes, encoding: str, max_bytes: int, iterations: int) -> float:
+    async def run() -> float:
+        start = time.process_time()
+        for _ in range(iterations):
+            await read_request_body(_FakeRequest(compressed, encoding), max_bytes)
+        return (time.process_time() - start) * 1000.0 / iterations
+    return asyncio.run(run())
+
+
+def _report(label: str, body: bytes, link_mbps: float, iterations: int) -> None:
+    bytes_per_ms = link_mbps * 1_000_000 / 8 / 1000
+    base_ms = len(body) / bytes_per_ms
+    print(f"\n{label}: {len(body):,} bytes, {base_ms:.1f} ms on a {link_mbps:g} Mbit/s link")
+    print(f"  {'encoding':<10}{'level':>6}{'size':>12}{'ratio':>8}{'compress':>11}{'decode':>10}{'net':>10}")
+    for encoding in response_encodings():
+        levels = (1, 3, 9) if encoding == "zstd" else (1, 6, 9)
+        for level in levels:
+            settings = CompressionSettings(enabled=True, min_bytes=0, encodings=[encoding], gzip_level=level, zstd_level=level)
+            compressed = settings.compress(body, encoding)
+            compress_ms = _cpu_ms(lambda: settings.compress(body, encoding), iterations)
+            decode_ms = _decode_cpu_ms(compressed, encoding, len(body), iterations)
+            net_ms = compress_ms + decode_ms + len(compressed) / bytes_per_ms - base_ms
+            print(f"  {encoding:<10}{level:>6}{len(compressed):>12,}{len(body) / len(compressed):>7.1f}x"
+                  f"{compress_ms:>9.2f}ms{decode_ms:>8.2f}ms{net_ms:>+8.1f}ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--link-mbps", type=float, default=10.0)
+    parser.add_argument("--turns", type=int, default=40)
+    parser.add_argument("--iterations", type=int, default=20)
+    args = parser.parse_args()
+    _report("request body", _request_body(args.turns), args.link_mbps, args.iterations)
+    _report("response body", _response_body(), args.link_mbps, args.iterations)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+CPU cost per streamed token with and without SSE coalescing.
+
+Runs many concurrent synthetic Anthropic streams (one upstream chunk per
+token) through a Starlette StreamingResponse into an ASGI send that frames each
+body as an HTTP/1.1 chunk and writes it to a real socket (as uvicorn does), and
+reports process CPU time per token, writes per stream, and time to first
+content delta (TTFT) added by the proxy. Coalescing is expected to cut writes
+per stream; CPU per token should stay close to passthrough.
+
+Usage:
+    python benchmarks/bench_sse.py [--streams 100] [--tokens 300] [--token-interval-ms 2]
+"""
+
+import argparse
+import asyncio
+import json
+import socket
+import statistics
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from starlette.responses import StreamingResponse
+
+from litelitellm.sse import SseCoalescer
+
+
+def _event(name: str, data: dict) -> bytes:
+    return f"event: {name}\ndata: {json.dumps(data)}\n\n".encode()
+
+
+async def _upstream(tokens: int, interval: float, first_delta_at: list):
+    yield _event("message_start", {"type": "message_start", "message": {"id": "msg_bench", "role": "assistant", "usage": {"input_tokens": 10}}})
+    yield _event("content_block_start", {"type": "content_block_start", "index": 0, "content_block": {"type": "text", "text": ""}})
+    for i in range(tokens):
+        await asyncio.sleep(interval)
+        if i == 0:
+            first_delta_at.append(time.perf_counter())
+        yield _event("content_block_delta", {"type": "content_block_delta", "index": 0, "delta": {"type": "text_delta", "text": f" tok{i}"}})
+    yield _event("content_block_stop", {"type": "content_block_stop", "index": 0})
+    yield _event("message_delta", {"type": "message_delta", "delta": {"stop_reason": "end_turn"}, "usage": {"output_tokens": tokens}})
+    yield _event("message_stop", {"type": "message_stop"})
+
+
+def _socket_sink() -> socket.socket:
+    """One end of a socketpair whose other end is drained by a background thread."""
+    # Blocking writes: the drain thread keeps the kernel buffer from filling, as a fast client would
+    writer, reader = socket.socketpair()
+
+    def drain() -> None:
+        while reader.recv(1 << 16):
+            pass
+
+    threading.Thread(target=drain, daemon=True).start()
+    return writer
+
+
+async def _one_stream(tokens: int, interval: float, coalescer, sock: socket.socket, result: dict) -> None:
+    first_delta_at: list = []
+    source = _upstream(tokens, interval, first_delta_at)
+    if coalescer is not None:
+        source = coalescer.coalesce(source)
+    writes = 0
+    seen_at = None
+
+    async def send(message: dict) -> None:
+        nonlocal writes, seen_at
+        if message["type"] == "http.response.body" and message.get("body"):
+            body = message["body"]
+            sock.sendall(b"%x\r\n%b\r\n" % (len(body), body))
+            writes += 1
+            if seen_at is None and b"content_block_delta" in message["body"]:
+                seen_at = time.perf_counter()
+
+    async def receive() -> dict:
+        await asyncio.sleep(3600)
+        return {"type": "http.disconnect"}
+
+    scope = {"type": "http", "asgi": {"version": "3.0", "spec_version": "2.4"}, "method": "POST", "headers": []}
+    await StreamingResponse(source, media_type="text/event-stream")(scope, receive, send)
+    result["writes"].append(writes)
+    result["ttft_added_ms"].append((seen_at - first_delta_at[0]) * 1000.0)
+
+
+async def _run(streams: int, tokens: int, interval: float, coalescer) -> dict:
+    result: dict = {"writes": [], "ttft_added_ms": []}
+    sock = _socket_sink()
+    cpu0, wall0 = time.process_time(), time.perf_counter()
+    await asyncio.gather(*(_one_stream(tokens, interval, coalescer, sock, result) for _ in range(streams)))
+    result["cpu_s"] = time.process_time() - cpu0
+    result["wall_s"] = time.perf_counter() - wall0
+    sock.close()
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--streams", type=int, default=100)
+    parser.add_argument("--tokens", type=int, default=300)
+    parser.add_argument("--token-interval-ms", type=float, default=2.0)
+    parser.add_argument("--max-bytes", type=int, default=16384)
+    parser.add_argument("--max-delay-ms", type=float, nargs="+", default=[5.0, 10.0, 20.0])
+    args = parser.parse_args()
+
+    total_tokens = args.streams * args.tokens
+    print(f"{args.streams} streams x {args.tokens} tokens, one token every {args.token_interval_ms}ms")
+    print(f"  {'mode':<22}{'cpu/token':>12}{'writes/stream':>15}{'ttft added':>12}{'wall':>9}")
+    modes = [("passthrough", None)] + [
+        (f"coalesce {d:g}ms", SseCoalescer(max_bytes=args.max_bytes, max_delay_ms=d)) for d in args.max_delay_ms
+    ]
+    for label, coalescer in modes:
+        r = asyncio.run(_run(args.streams, args.tokens, args.token_interval_ms / 1000.0, coalescer))
+        print(f"  {label:<22}{r['cpu_s'] * 1e6 / total_tokens:>10.1f}us{statistics.mean(r['writes']):>15.1f}"
+              f"{statistics.median(r['ttft_added_ms']):>10.2f}ms{r['wall_s']:>8.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -12,51 +12,130 @@ local middleware. No middleware is bundled; run with a config in your project to
 """
 
 
+class _StartupTimer:
+    """Collects per-phase wall time for the startup summary line."""
+
+    def __init__(self) -> None:
+        import time
+        self._clock = time.perf_counter
+        self._start = self._last = self._clock()
+        self.phases: list[tuple[str, float]] = []
+
+    def mark(self, name: str) -> None:
+        now = self._clock()
+        self.phases.append((name, (now - self._last) * 1000.0))
+        self._last = now
+
+    def summary(self) -> str:
+        parts = ", ".join(f"{name} {ms:.1f}ms" for name, ms in self.phases)
+        return f"{parts} (total {(self._last - self._start) * 1000.0:.1f}ms)"
+
+
 def main() -> None:
+    timer = _StartupTimer()
     from pathlib import Path
 
     from dotenv import load_dotenv
 
-    from litelitellm.config_loader import find_config_path, load_middleware_from_config
+    from litelitellm.config_loader import (
+        find_config_path,
+        get_litelitellm_settings,
+        load_config,
+        load_pipeline_from_config,
+    )
 
     config_path = find_config_path()
     # Load .env from the directory we use for config (project root), so uv tool run from another folder picks it up
     project_dir = config_path.parent if config_path else Path.cwd()
     load_dotenv(project_dir / ".env")
 
+    from litelitellm import config, logsink
+
+    # Diagnostics from here on go to the configured log outputs, in order
+    project_config = load_config(config_path)
+    settings = get_litelitellm_settings(project_config)
+    if settings.get("logging"):
+        logsink.configure(settings["logging"])
+    # Fail fast, before the heavy server imports
+    if not config.ANTHROPIC_API_KEY:
+        logsink.diag("WARNING: ANTHROPIC_API_KEY not set!")
+        logsink.diag("  Set ANTHROPIC_API_KEY for outbound requests (required when middleware modifies requests).")
+        exit(1)
+    timer.mark("config")
+
     from litelitellm.shim import install_shim, set_acompletion_impl
     install_shim()
-    middleware = load_middleware_from_config(config_path=config_path)
+    middleware = load_pipeline_from_config(project_config, config_path=config_path)
     if middleware is not None:
-        print(f"[litelitellm] Middleware loaded from config: {config_path} -> {middleware}")
+        logsink.diag(f"Middleware loaded from config: {config_path} -> {middleware}")
+        for hook in middleware.hooks:
+            memo = f", memoized on {', '.join(hook.memo.fields) if hook.memo.fields is not None else 'whole request'}" if hook.memo is not None else ""
+            logsink.diag(f"  {hook.name}: {hook.callback} (timeout={hook.timeout}, fail={'closed' if hook.fail_closed else 'open'}{memo})")
     else:
-        print("[litelitellm] No config or callbacks found - running as passthrough only")
+        logsink.diag("No config or callbacks found - running as passthrough only")
         middleware = None
+    timer.mark("middleware")
 
     from litelitellm.anthropic_client import acompletion_anthropic
     set_acompletion_impl(acompletion_anthropic)
 
     from litelitellm.server import app
-    from litelitellm import config
     import litelitellm.server as server_module
+    timer.mark("server")
 
     server_module.middleware = middleware
 
-    if not config.ANTHROPIC_API_KEY:
-        print("[litelitellm] WARNING: ANTHROPIC_API_KEY not set!")
-        print("[litelitellm]   Set ANTHROPIC_API_KEY for outbound requests (required when middleware modifies requests).")
-        print()
-        exit(1)
+    from litelitellm.compression import CompressionSettings
+    server_module.compression = CompressionSettings.from_settings(settings.get("compression") or {})
+    if server_module.compression.enabled:
+        logsink.diag(f"Response compression: {', '.join(server_module.compression.encodings)} (>= {server_module.compression.min_bytes} bytes)")
+
+    from litelitellm.sse import SseCoalescer
+    server_module.sse_coalescer = SseCoalescer.from_settings(settings.get("sse_coalescing") or {})
+    if server_module.sse_coalescer is not None:
+        logsink.diag(f"SSE coalescing: up to {server_module.sse_coalescer.max_bytes} bytes / {server_module.sse_coalescer.max_delay * 1000:.0f}ms per write")
+
+    from litelitellm import observability
+    from litelitellm.sampling import SamplingPolicy
+    observability.sampling_policy = SamplingPolicy.from_settings(settings.get("trace_sampling") or {})
+    if observability.sampling_policy is not None:
+        logsink.diag(f"Trace sampling: head rate {observability.sampling_policy.rate} (tail rules always export)")
+
+    from litelitellm.routing import SloRouter
+    server_module.slo_router = SloRouter.from_settings(settings.get("slo_routing") or {})
+    if server_module.slo_router is not None:
+        for rule in server_module.slo_router.rules:
+            logsink.diag(f"SLO routing: {rule.model} -> {rule.fallback} (max TTFT {rule.max_ttft_ms}ms, max error rate {rule.max_error_rate})")
+
+    from litelitellm.blob_dedup import BlobDeduplicator
+    server_module.blob_dedup = BlobDeduplicator.from_settings(settings.get("blob_dedup") or {})
+    if server_module.blob_dedup is not None:
+        logsink.diag(f"Blob dedup enabled (min {server_module.blob_dedup.min_bytes} bytes, Files API)")
+
+    if config_path is not None and (config.LITELITELLM_RELOAD or settings.get("hot_reload")):
+        from litelitellm.reload import DEFAULT_POLL_INTERVAL, ConfigWatcher
+
+        def _set_middleware(pipeline):
+            server_module.middleware = pipeline
+
+        server_module.config_watcher = ConfigWatcher(
+            config_path,
+            get_current=lambda: server_module.middleware,
+            set_current=_set_middleware,
+            interval=float(settings.get("hot_reload_interval", DEFAULT_POLL_INTERVAL)),
+        )
+        logsink.diag(f"Hot reload: watching {config_path} and callback modules")
+    timer.mark("settings")
 
     from importlib.metadata import version
-    print(f"[litelitellm] version {version('litelitellm')}")
-    print(f"[litelitellm] Starting on {config.LITELITELLM_HOST}:{config.LITELITELLM_PORT}")
-    print(f"[litelitellm] Anthropic API: {config.ANTHROPIC_API_URL}")
-    print()
-    print(f"  Set ANTHROPIC_BASE_URL=http://localhost:{config.LITELITELLM_PORT} to route traffic through this proxy")
-    print()
+    logsink.diag(f"version {version('litelitellm')}")
+    logsink.diag(f"Starting on {config.LITELITELLM_HOST}:{config.LITELITELLM_PORT}")
+    logsink.diag(f"Anthropic API: {config.ANTHROPIC_API_URL}")
+    logsink.diag(f"Set ANTHROPIC_BASE_URL=http://localhost:{config.LITELITELLM_PORT} to route traffic through this proxy")
 
     import uvicorn
+    timer.mark("uvicorn")
+    logsink.diag(f"Startup: {timer.summary()}")
     uvicorn.run(app, host=config.LITELITELLM_HOST, port=config.LITELITELLM_PORT, log_level="info")
 
 
@@ -5,22 +5,29 @@ Provides stream_to_anthropic(), call_anthropic(), and acompletion_anthropic() fo
 """
 
 import contextvars
-from typing import Any, AsyncIterator, Dict, List, Optional
-
-import httpx
+import threading
+from typing import TYPE_CHECKING, Any, AsyncIterator, Dict, List, Optional
 
 from . import config
 
+if TYPE_CHECKING:
+    import httpx
+
 _request_api_key: contextvars.ContextVar[str] = contextvars.ContextVar("_request_api_key", default="")
 _request_passthrough_headers: contextvars.ContextVar[Optional[Dict]] = contextvars.ContextVar("_request_passthrough_headers", default=None)
 
-_client: Optional[httpx.AsyncClient] = None
+_client: Optional["httpx.AsyncClient"] = None
+_client_lock = threading.Lock()
 
 
-def _get_client() -> httpx.AsyncClient:
+def _get_client() -> "httpx.AsyncClient":
+    # httpx is imported on first use (server startup warms it in a worker thread)
     global _client
     if _client is None:
-        _client = httpx.AsyncClient(timeout=httpx.Timeout(300.0, connect=10.0))
+        with _client_lock:
+            if _client is None:
+                import httpx
+                _client = httpx.AsyncClient(timeout=httpx.Timeout(300.0, connect=10.0))
     return _client
 
 
@@ -75,30 +82,183 @@ async def call_anthropic(
 
 
 class ContentBlock:
+    """
+    Attribute view over one raw content block dict (LiteLLM-style block.text,
+    block.input, ...). Nothing is copied: reads resolve against the dict on
+    demand and attribute writes go straight back into it.
+    """
+
+    __slots__ = ("_data",)
+
     def __init__(self, data: Dict):
-        self._data = data
-        for k, v in data.items():
-            setattr(self, k, v)
+        object.__setattr__(self, "_data", data)
+
+    def __getattr__(self, name: str) -> Any:
+        if name.startswith("__") or name == "_data":
+            raise AttributeError(name)
+        try:
+            return self._data[name]
+        except KeyError:
+            raise AttributeError(f"{type(self).__name__!s} has no attribute {name!r}") from None
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        self._data[name] = value
+
+    def __delattr__(self, name: str) -> None:
+        try:
+            del self._data[name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self._data!r})"
+
+    def __reduce__(self):
+        return (type(self), (self._data,))
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self._data.get(key, default)
 
     def model_dump(self) -> Dict:
         return dict(self._data)
 
 
+class TextBlock(ContentBlock):
+    __slots__ = ()
+
+    @property
+    def text(self) -> str:
+        return self._data.get("text", "")
+
+
+class ToolUseBlock(ContentBlock):
+    __slots__ = ()
+
+    @property
+    def id(self) -> str:
+        return self._data.get("id", "")
+
+    @property
+    def name(self) -> str:
+        return self._data.get("name", "")
+
+    @property
+    def input(self) -> Dict:
+        return self._data.get("input", {})
+
+
+class ThinkingBlock(ContentBlock):
+    __slots__ = ()
+
+    @property
+    def thinking(self) -> str:
+        return self._data.get("thinking", "")
+
+    @property
+    def signature(self) -> str:
+        return self._data.get("signature", "")
+
+
+_BLOCK_VIEWS = {"text": TextBlock, "tool_use": ToolUseBlock, "thinking": ThinkingBlock}
+
+
+def _block_view(block: Any) -> Any:
+    if not isinstance(block, dict):
+        return block
+    return _BLOCK_VIEWS.get(block.get("type"), ContentBlock)(block)
+
+
+def _raw_block(block: Any) -> Any:
+    if isinstance(block, ContentBlock):
+        return block._data
+    if hasattr(block, "model_dump"):
+        return block.model_dump()
+    return block
+
+
 class AnthropicResponse:
+    """
+    Lazy view over a raw Messages API response dict. Top-level fields resolve
+    on attribute access; content block views are created on first access to
+    .content. Attribute writes (including to block views) update the underlying
+    dict. Once .content has been handed out, that list is the source of truth:
+    blocks appended, inserted or replaced in it reach the dict when it is read
+    back through to_dict() (or text, model_dump, ...), not through _data.
+    """
+
+    __slots__ = ("_data", "_content")
+
+    _DEFAULTS = {
+        "id": "",
+        "type": "message",
+        "role": "assistant",
+        "model": "",
+        "stop_reason": None,
+        "stop_sequence": None,
+    }
+
     def __init__(self, data: Dict):
-        self._data = data
-        self.id = data.get("id", "")
-        self.type = data.get("type", "message")
-        self.role = data.get("role", "assistant")
-        self.model = data.get("model", "")
-        self.stop_reason = data.get("stop_reason")
-        self.stop_sequence = data.get("stop_sequence")
-        self.usage = data.get("usage", {})
-        raw_content = data.get("content", [])
-        self.content = [ContentBlock(b) if isinstance(b, dict) else b for b in raw_content]
+        object.__setattr__(self, "_data", data)
+        object.__setattr__(self, "_content", None)
+
+    def __getattr__(self, name: str) -> Any:
+        if name.startswith("__") or name in ("_data", "_content"):
+            raise AttributeError(name)
+        data = self._data
+        if name in data:
+            return data[name]
+        if name in self._DEFAULTS:
+            return self._DEFAULTS[name]
+        if name == "usage":
+            return {}
+        raise AttributeError(f"AnthropicResponse has no attribute {name!r}")
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        if name == "content":
+            value = [_raw_block(b) for b in value]
+            object.__setattr__(self, "_content", None)
+        self._data[name] = value
+
+    def __reduce__(self):
+        return (AnthropicResponse, (self.to_dict(),))
+
+    def __repr__(self) -> str:
+        return f"AnthropicResponse(id={self.id!r}, model={self.model!r}, stop_reason={self.stop_reason!r})"
+
+    @property
+    def content(self) -> List[Any]:
+        if self._content is None:
+            object.__setattr__(self, "_content", [_block_view(b) for b in self._data.get("content", [])])
+        return self._content
+
+    def to_dict(self) -> Dict:
+        """The underlying dict, with content rebuilt from .content if it was handed out (it may have been edited in place)."""
+        if self._content is not None:
+            self._data["content"] = [_raw_block(b) for b in self._content]
+        return self._data
+
+    def _blocks_of(self, block_type: str) -> List[Any]:
+        return [_block_view(b) for b in self.to_dict().get("content", []) if isinstance(b, dict) and b.get("type") == block_type]
+
+    @property
+    def text_blocks(self) -> List[TextBlock]:
+        return self._blocks_of("text")
+
+    @property
+    def tool_use_blocks(self) -> List[ToolUseBlock]:
+        return self._blocks_of("tool_use")
+
+    @property
+    def thinking_blocks(self) -> List[ThinkingBlock]:
+        return self._blocks_of("thinking")
+
+    @property
+    def text(self) -> str:
+        """Concatenated text of all text blocks."""
+        return "".join(b.get("text", "") for b in self.to_dict().get("content", []) if isinstance(b, dict) and b.get("type") == "text")
 
     def model_dump(self) -> Dict:
-        return dict(self._data)
+        return dict(self.to_dict())
 
 
 async def acompletion_anthropic(
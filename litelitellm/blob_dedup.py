@@ -0,0 +1,337 @@
+"""
+Content-addressed dedup of large base64 image/document blocks.
+
+Clients such as Claude Code resend the same screenshots and PDFs on every turn.
+When enabled, each large base64 source is hashed; the first time a blob is seen
+it is uploaded once to the Files API and every occurrence is rewritten to a
+file_id reference. A bounded local index maps (api key, hash) -> file id with an
+expiry; when an entry expires or is evicted its file is deleted from the Files
+API, so a re-upload does not leave a duplicate behind. If upstream rejects a
+request that referenced uploaded files (e.g. one was deleted), the proxy
+forgets those files and retries the request with the blobs inline. A failed
+upload pauses uploads for that API key only. Observability receives a copy of
+the body in which each large blob is replaced by its hash.
+
+Config (litelitellm_settings.blob_dedup):
+  enabled: true
+  min_bytes: 65536        # base64 length below which blocks are left inline
+  max_entries: 1024       # index size (LRU)
+  ttl_seconds: 86400      # re-upload after this long
+  files_api_url: ...      # defaults to ANTHROPIC_API_URL; point at a local mock to test
+"""
+
+import asyncio
+import base64
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+from . import config, logsink
+
+FILES_API_BETA = "files-api-2025-04-14"
+
+DEFAULT_MIN_BYTES = 64 * 1024
+DEFAULT_MAX_ENTRIES = 1024
+DEFAULT_TTL_SECONDS = 24 * 3600
+UPLOAD_FAILURE_BACKOFF_SECONDS = 60.0
+
+_BLOB_TYPES = ("image", "document")
+# Error types upstream uses for a bad file_id (missing, deleted, other workspace)
+_FILE_REJECTION_TYPES = ("invalid_request_error", "not_found_error", "permission_error")
+_EXTENSIONS = {
+    "image/jpeg": "jpg",
+    "image/png": "png",
+    "image/gif": "gif",
+    "image/webp": "webp",
+    "application/pdf": "pdf",
+}
+
+
+def rejects_file(error_type: str, message: str) -> bool:
+    """Whether an upstream error looks like it refused a file_id the request referenced."""
+    return error_type in _FILE_REJECTION_TYPES and "file" in message.lower()
+
+
+class _Entry:
+    __slots__ = ("file_id", "expires_at", "api_key", "anthropic_version")
+
+    def __init__(self, file_id: str, expires_at: float, api_key: str, anthropic_version: str) -> None:
+        self.file_id = file_id
+        self.expires_at = expires_at
+        # Kept so the file can be deleted with the credentials that created it
+        self.api_key = api_key
+        self.anthropic_version = anthropic_version
+
+
+class BlobDeduplicator:
+    """Rewrites repeated large base64 blocks to Files API references."""
+
+    def __init__(
+        self,
+        min_bytes: int = DEFAULT_MIN_BYTES,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        ttl_seconds: float = DEFAULT_TTL_SECONDS,
+        files_api_url: Optional[str] = None,
+    ) -> None:
+        self.min_bytes = min_bytes
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.files_api_url = files_api_url
+        self._index: "OrderedDict[Tuple[str, str], _Entry]" = OrderedDict()
+        self._pending: Dict[Tuple[str, str], "asyncio.Future[Optional[str]]"] = {}
+        # key_id -> monotonic time uploads for that API key may resume
+        self._upload_backoff_until: Dict[str, float] = {}
+        self._background: Set[asyncio.Task] = set()
+        self.hits = 0
+        self.uploads = 0
+        self.upload_failures = 0
+        self.rejected = 0
+        self.deletes = 0
+        self.delete_failures = 0
+        self.bytes_saved = 0
+
+    @classmethod
+    def from_settings(cls, settings: Dict[str, Any]) -> Optional["BlobDeduplicator"]:
+        """Build from the blob_dedup settings section; None unless enabled."""
+        if not settings or not settings.get("enabled"):
+            return None
+        return cls(
+            min_bytes=int(settings.get("min_bytes", DEFAULT_MIN_BYTES)),
+            max_entries=int(settings.get("max_entries", DEFAULT_MAX_ENTRIES)),
+            ttl_seconds=float(settings.get("ttl_seconds", DEFAULT_TTL_SECONDS)),
+            files_api_url=settings.get("files_api_url"),
+        )
+
+    async def rewrite(
+        self,
+        data: Dict[str, Any],
+        api_key: str,
+        anthropic_version: str,
+        upload: bool = True,
+    ) -> Tuple[Dict[str, Any], Dict[str, Any], bool]:
+        """
+        Return (forward_data, logged_data, rewrote_any). Neither input dicts nor
+        their nested lists are modified; changed messages are shallow-copied.
+        With upload=False only logged_data is produced (no index lookups or uploads).
+        """
+        messages = data.get("messages")
+        if not isinstance(messages, list):
+            return data, data, False
+        key_id = hashlib.sha256(api_key.encode()).hexdigest()[:16]
+        forward_messages: Optional[List[Any]] = None
+        logged_messages: Optional[List[Any]] = None
+        rewrote = False
+        for i, msg in enumerate(messages):
+            content = msg.get("content") if isinstance(msg, dict) else None
+            if not isinstance(content, list):
+                continue
+            fwd, logged, changed = await self._rewrite_blocks(content, key_id, api_key, anthropic_version, upload)
+            if logged is content:
+                continue
+            if forward_messages is None:
+                forward_messages = list(messages)
+                logged_messages = list(messages)
+            forward_messages[i] = {**msg, "content": fwd} if fwd is not content else msg
+            logged_messages[i] = {**msg, "content": logged}
+            rewrote = rewrote or changed
+        if forward_messages is None:
+            return data, data, False
+        forward = {**data, "messages": forward_messages} if rewrote else data
+        return forward, {**data, "messages": logged_messages}, rewrote
+
+    async def _rewrite_blocks(
+        self,
+        blocks: List[Any],
+        key_id: str,
+        api_key: str,
+        anthropic_version: str,
+        upload: bool,
+    ) -> Tuple[List[Any], List[Any], bool]:
+        forward: Optional[List[Any]] = None
+        logged: Optional[List[Any]] = None
+        rewrote = False
+        for i, block in enumerate(blocks):
+            if not isinstance(block, dict):
+                continue
+            fwd_block, logged_block = block, block
+            if block.get("type") in _BLOB_TYPES:
+                source = block.get("source")
+                if isinstance(source, dict) and source.get("type") == "base64":
+                    blob = source.get("data")
+                    if isinstance(blob, str) and len(blob) >= self.min_bytes:
+                        digest = hashlib.sha256(blob.encode("ascii", errors="replace")).hexdigest()
+                        logged_block = {**block, "source": {
+                            "type": "sha256",
+                            "sha256": digest,
+                            "media_type": source.get("media_type"),
+                            "size": len(blob),
+                        }}
+                        file_id = await self._file_id_for(key_id, digest, source, api_key, anthropic_version) if upload else None
+                        if file_id:
+                            fwd_block = {**block, "source": {"type": "file", "file_id": file_id}}
+                            rewrote = True
+            elif block.get("type") == "tool_result" and isinstance(block.get("content"), list):
+                inner_fwd, inner_logged, changed = await self._rewrite_blocks(block["content"], key_id, api_key, anthropic_version, upload)
+                if inner_logged is not block["content"]:
+                    fwd_block = {**block, "content": inner_fwd} if inner_fwd is not block["content"] else block
+                    logged_block = {**block, "content": inner_logged}
+                    rewrote = rewrote or changed
+            if logged_block is block:
+                continue
+            if logged is None:
+                forward = list(blocks)
+                logged = list(blocks)
+            forward[i] = fwd_block
+            logged[i] = logged_block
+        if logged is None:
+            return blocks, blocks, False
+        return (forward if rewrote else blocks), logged, rewrote
+
+    async def _file_id_for(
+        self,
+        key_id: str,
+        digest: str,
+        source: Dict[str, Any],
+        api_key: str,
+        anthropic_version: str,
+    ) -> Optional[str]:
+        key = (key_id, digest)
+        now = time.monotonic()
+        entry = self._index.get(key)
+        if entry is not None:
+            if entry.expires_at > now:
+                self._index.move_to_end(key)
+                self.hits += 1
+                self.bytes_saved += len(source.get("data", ""))
+                return entry.file_id
+            del self._index[key]
+            self._delete_later(entry)
+        pending = self._pending.get(key)
+        if pending is not None:
+            return await asyncio.shield(pending)
+        backoff_until = self._upload_backoff_until.get(key_id)
+        if backoff_until is not None:
+            if now < backoff_until:
+                return None
+            del self._upload_backoff_until[key_id]
+        future: "asyncio.Future[Optional[str]]" = asyncio.get_running_loop().create_future()
+        self._pending[key] = future
+        file_id = None
+        try:
+            file_id = await self._upload(digest, source, api_key, anthropic_version)
+        except Exception as e:
+            self.upload_failures += 1
+            if len(self._upload_backoff_until) >= self.max_entries:
+                self._upload_backoff_until.clear()
+            self._upload_backoff_until[key_id] = time.monotonic() + UPLOAD_FAILURE_BACKOFF_SECONDS
+            logsink.diag(f"Blob upload failed for sha256:{digest[:12]}: {e}")
+        finally:
+            del self._pending[key]
+            future.set_result(file_id)
+        if file_id:
+            self.uploads += 1
+            self._index[key] = _Entry(file_id, time.monotonic() + self.ttl_seconds, api_key, anthropic_version)
+            while len(self._index) > self.max_entries:
+                _, evicted = self._index.popitem(last=False)
+                self._delete_later(evicted)
+        return file_id
+
+    def forget(self, data: Dict[str, Any]) -> int:
+        """
+        Drop (and delete) every indexed file that data references, after upstream
+        rejected the request. The next request carrying those blobs uploads them again.
+        """
+        file_ids = set(_file_ids(data.get("messages")))
+        if not file_ids:
+            return 0
+        dropped = [key for key, entry in self._index.items() if entry.file_id in file_ids]
+        for key in dropped:
+            self._delete_later(self._index.pop(key))
+        self.rejected += 1
+        return len(dropped)
+
+    def _delete_later(self, entry: _Entry) -> None:
+        task = asyncio.get_running_loop().create_task(self._delete(entry))
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    async def _delete(self, entry: _Entry) -> None:
+        from .anthropic_client import _get_client
+        base_url = (self.files_api_url or config.ANTHROPIC_API_URL).rstrip("/")
+        try:
+            resp = await _get_client().delete(
+                f"{base_url}/v1/files/{entry.file_id}",
+                headers={
+                    "x-api-key": entry.api_key,
+                    "anthropic-version": entry.anthropic_version,
+                    "anthropic-beta": FILES_API_BETA,
+                },
+            )
+            # Already gone is as good as deleted
+            if resp.status_code != 404:
+                resp.raise_for_status()
+            self.deletes += 1
+        except Exception as e:
+            self.delete_failures += 1
+            logsink.diag(f"Blob file delete failed for {entry.file_id}: {e}")
+
+    async def _upload(self, digest: str, source: Dict[str, Any], api_key: str, anthropic_version: str) -> Optional[str]:
+        from .anthropic_client import _get_client
+        media_type = source.get("media_type") or "application/octet-stream"
+        raw = base64.b64decode(source["data"])
+        filename = f"{digest[:16]}.{_EXTENSIONS.get(media_type, 'bin')}"
+        base_url = (self.files_api_url or config.ANTHROPIC_API_URL).rstrip("/")
+        resp = await _get_client().post(
+            f"{base_url}/v1/files",
+            headers={
+                "x-api-key": api_key,
+                "anthropic-version": anthropic_version,
+                "anthropic-beta": FILES_API_BETA,
+            },
+            files={"file": (filename, raw, media_type)},
+        )
+        resp.raise_for_status()
+        return resp.json().get("id")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self._index),
+            "hits": self.hits,
+            "uploads": self.uploads,
+            "upload_failures": self.upload_failures,
+            "rejected": self.rejected,
+            "deletes": self.deletes,
+            "delete_failures": self.delete_failures,
+            "bytes_saved": self.bytes_saved,
+        }
+
+
+def _file_ids(blocks: Any) -> Iterator[str]:
+    """file_ids of the file sources in a messages list (or content list), tool results included."""
+    if not isinstance(blocks, list):
+        return
+    for item in blocks:
+        if not isinstance(item, dict):
+            continue
+        if "role" in item:
+            yield from _file_ids(item.get("content"))
+            continue
+        source = item.get("source")
+        if isinstance(source, dict) and source.get("type") == "file" and source.get("file_id"):
+            yield source["file_id"]
+        elif item.get("type") == "tool_result":
+            yield from _file_ids(item.get("content"))
+
+
+def with_beta(headers: Dict[str, str], beta: str) -> Dict[str, str]:
+    """Return a copy of headers with beta added to anthropic-beta (case-insensitive)."""
+    out = dict(headers)
+    for k, v in headers.items():
+        if k.lower() == "anthropic-beta":
+            betas = [b.strip() for b in v.split(",") if b.strip()]
+            if beta not in betas:
+                out[k] = ", ".join(betas + [beta])
+            return out
+    out["anthropic-beta"] = beta
+    return out
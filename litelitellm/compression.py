@@ -0,0 +1,203 @@
+"""
+Compressed request bodies (Content-Encoding) and compressed non-streaming
+responses (Accept-Encoding).
+
+Request bodies may be gzip, deflate or zstd; responses are only ever gzip or
+zstd (deflate is accepted but never offered). gzip/deflate use the standard
+library; zstd needs the optional `zstandard` package and is neither accepted
+nor offered without it.
+
+Config (litelitellm_settings.compression):
+  enabled: true                     # compress responses (request decoding is always on)
+  min_bytes: 1024                   # smallest response body worth compressing
+  encodings: [zstd, gzip]           # response preference order (zstd, gzip)
+  gzip_level: 6
+  zstd_level: 3
+  max_request_body_bytes: 33554432  # cap on decompressed request bodies
+"""
+
+import gzip
+import io
+import json
+import zlib
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+DEFAULT_MIN_BYTES = 1024
+DEFAULT_GZIP_LEVEL = 6
+DEFAULT_ZSTD_LEVEL = 3
+DEFAULT_MAX_REQUEST_BODY_BYTES = 32 * 1024 * 1024
+
+_READ_SIZE = 64 * 1024
+
+
+class BodyDecodeError(Exception):
+    """Request body could not be decoded; carries the HTTP status to return."""
+
+    def __init__(self, status_code: int, message: str) -> None:
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class CompressionSettings:
+    """Response compression policy and request decoding limits."""
+
+    def __init__(
+        self,
+        enabled: bool = False,
+        min_bytes: int = DEFAULT_MIN_BYTES,
+        encodings: Optional[List[str]] = None,
+        gzip_level: int = DEFAULT_GZIP_LEVEL,
+        zstd_level: int = DEFAULT_ZSTD_LEVEL,
+        max_request_body_bytes: int = DEFAULT_MAX_REQUEST_BODY_BYTES,
+    ) -> None:
+        self.enabled = enabled
+        self.min_bytes = min_bytes
+        self.encodings = [e for e in (encodings or ["zstd", "gzip"]) if e in response_encodings()]
+        self.gzip_level = gzip_level
+        self.zstd_level = zstd_level
+        self.max_request_body_bytes = max_request_body_bytes
+
+    @classmethod
+    def from_settings(cls, settings: Dict[str, Any]) -> "CompressionSettings":
+        settings = settings or {}
+        return cls(
+            enabled=bool(settings.get("enabled", False)),
+            min_bytes=int(settings.get("min_bytes", DEFAULT_MIN_BYTES)),
+            encodings=[str(e).lower() for e in settings["encodings"]] if settings.get("encodings") else None,
+            gzip_level=int(settings.get("gzip_level", DEFAULT_GZIP_LEVEL)),
+            zstd_level=int(settings.get("zstd_level", DEFAULT_ZSTD_LEVEL)),
+            max_request_body_bytes=int(settings.get("max_request_body_bytes", DEFAULT_MAX_REQUEST_BODY_BYTES)),
+        )
+
+    def negotiate(self, accept_encoding: Optional[str]) -> Optional[str]:
+        """Pick a response encoding from Accept-Encoding, or None for identity."""
+        if not self.enabled or not accept_encoding:
+            return None
+        accepted = _parse_accept_encoding(accept_encoding)
+        for enc in self.encodings:
+            q = accepted.get(enc, accepted.get("*", 0.0))
+            if q > 0:
+                return enc
+        return None
+
+    def compress(self, body: bytes, encoding: str) -> bytes:
+        if encoding == "gzip":
+            return gzip.compress(body, compresslevel=self.gzip_level, mtime=0)
+        if encoding == "zstd" and zstandard is not None:
+            return zstandard.ZstdCompressor(level=self.zstd_level).compress(body)
+        raise ValueError(f"unsupported encoding {encoding!r}")
+
+    def encode_response(self, body: bytes, accept_encoding: Optional[str]) -> Tuple[bytes, Optional[str]]:
+        """Return (body, content_encoding) - compressed when negotiated and large enough."""
+        if len(body) < self.min_bytes:
+            return body, None
+        encoding = self.negotiate(accept_encoding)
+        if encoding is None:
+            return body, None
+        return self.compress(body, encoding), encoding
+
+
+def request_encodings() -> List[str]:
+    """Content-Encodings accepted on request bodies."""
+    return ["zstd", "gzip", "deflate"] if zstandard is not None else ["gzip", "deflate"]
+
+
+def response_encodings() -> List[str]:
+    """Encodings CompressionSettings.compress can produce."""
+    return ["zstd", "gzip"] if zstandard is not None else ["gzip"]
+
+
+def _parse_accept_encoding(header: str) -> Dict[str, float]:
+    out: Dict[str, float] = {}
+    for part in header.split(","):
+        token, _, params = part.strip().partition(";")
+        token = token.strip().lower()
+        if not token:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        out[token] = q
+    return out
+
+
+async def read_request_body(request: Any, max_bytes: int = DEFAULT_MAX_REQUEST_BODY_BYTES) -> bytes:
+    """
+    Read the request body, decoding Content-Encoding gzip/deflate/zstd as it
+    streams in; multi-member gzip bodies are decoded in full. Raises
+    BodyDecodeError (415 unsupported encoding, 400 corrupt or trailing data,
+    413 decoded body over max_bytes).
+    """
+    encoding = (request.headers.get("content-encoding") or "identity").strip().lower()
+    if encoding in ("", "identity"):
+        return await request.body()
+    if encoding not in request_encodings():
+        raise BodyDecodeError(415, f"Unsupported Content-Encoding: {encoding}")
+    if encoding == "zstd":
+        return await _read_zstd(request, max_bytes)
+
+    wbits = 16 + zlib.MAX_WBITS if encoding == "gzip" else zlib.MAX_WBITS
+    decoder = zlib.decompressobj(wbits)
+    out = bytearray()
+    try:
+        async for chunk in request.stream():
+            data = chunk
+            while data:
+                out += decoder.decompress(data, max_bytes + 1 - len(out))
+                if len(out) > max_bytes:
+                    raise BodyDecodeError(413, f"Decoded request body exceeds {max_bytes} bytes")
+                data = decoder.unconsumed_tail
+                if decoder.eof and decoder.unused_data:
+                    data = decoder.unused_data.lstrip(b"\0") if encoding == "gzip" else decoder.unused_data
+                    if not data:
+                        # gzip zero padding; later chunks land in unused_data again
+                        continue
+                    if encoding != "gzip":
+                        raise BodyDecodeError(400, f"Trailing data after {encoding} request body")
+                    # Concatenated gzip members decode to the concatenation (RFC 1952 2.2)
+                    decoder = zlib.decompressobj(wbits)
+        out += decoder.flush()
+    except zlib.error as e:
+        raise BodyDecodeError(400, f"Invalid {encoding} request body: {e}") from None
+    if len(out) > max_bytes:
+        raise BodyDecodeError(413, f"Decoded request body exceeds {max_bytes} bytes")
+    if not decoder.eof:
+        raise BodyDecodeError(400, f"Truncated {encoding} request body")
+    return bytes(out)
+
+
+async def _read_zstd(request: Any, max_bytes: int) -> bytes:
+    # zstandard's decompressobj has no output limit, so buffer the (bounded)
+    # compressed input and read the decoded stream in fixed-size pieces.
+    compressed = bytearray()
+    async for chunk in request.stream():
+        compressed += chunk
+        if len(compressed) > max_bytes:
+            raise BodyDecodeError(413, f"Request body exceeds {max_bytes} bytes")
+    out = bytearray()
+    try:
+        with zstandard.ZstdDecompressor().stream_reader(io.BytesIO(bytes(compressed))) as reader:
+            while True:
+                piece = reader.read(_READ_SIZE)
+                if not piece:
+                    break
+                out += piece
+                if len(out) > max_bytes:
+                    raise BodyDecodeError(413, f"Decoded request body exceeds {max_bytes} bytes")
+    except zstandard.ZstdError as e:
+        raise BodyDecodeError(400, f"Invalid zstd request body: {e}") from None
+    return bytes(out)
+
+
+def dumps_json(content: Any) -> bytes:
+    """Serialize like starlette's JSONResponse."""
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
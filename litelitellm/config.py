@@ -10,6 +10,8 @@ ANTHROPIC_API_KEY = os.environ.get("ANTHROPIC_API_KEY", "")
 LITELITELLM_HOST = os.environ.get("LITELITELLM_HOST", "0.0.0.0")
 LITELITELLM_PORT = int(os.environ.get("LITELITELLM_PORT", "4000"))
 ANTHROPIC_API_URL = os.environ.get("ANTHROPIC_API_URL", "https://api.anthropic.com")
+# Watch config + middleware files and hot-reload them (also litelitellm_settings.hot_reload)
+LITELITELLM_RELOAD = os.environ.get("LITELITELLM_RELOAD", "").strip().lower() in ("1", "true", "yes")
 # Optional Langfuse (set both keys to enable tracing)
 LANGFUSE_SECRET_KEY = os.environ.get("LANGFUSE_SECRET_KEY", "")
 LANGFUSE_PUBLIC_KEY = os.environ.get("LANGFUSE_PUBLIC_KEY", "")
@@ -5,17 +5,38 @@ from any project (e.g. uvx litelitellm) and load that project's local middleware
 Config format matches LiteLLM proxy:
   litellm_settings:
     callbacks: ["my_middleware_loader"]   # or "module.attribute"
+
+Proxy-only settings live under a separate top-level key so the file stays valid
+for LiteLLM:
+  litelitellm_settings:
+    hook_timeout: 30              # seconds per pre-call hook
+    hook_failure_policy: open     # open (skip failing hook) | closed (reject request)
+    log_hook_timeout: 10          # seconds per logging callback
+    sync_hook_workers: 4          # threads for sync CustomLogger hooks (log_success_event, ...)
+    sync_hook_queue_size: 256     # queued sync hook calls before new ones are dropped
+    sync_hook_timeout: 10         # seconds before a sync hook is reported as slow
+    pre_call_cache_entries: 128   # per memoized hook (see memo.py)
+    pre_call_cache_bytes: 67108864
+    pre_call_cache_max_refusals: 3
+    pre_call_cache_max_key_bytes: 1048576
+    callback_settings:
+      my_middleware_loader: {timeout: 2, failure_policy: closed, memoize: [system, tools]}
 """
 
 import os
 import sys
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
-try:
-    import yaml
-except ImportError:
-    yaml = None
+from . import logsink
+from .memo import DEFAULT_MAX_BYTES, DEFAULT_MAX_ENTRIES, DEFAULT_MAX_KEY_BYTES, DEFAULT_MAX_REFUSALS, PreCallMemo, declared_fields
+from .pipeline import DEFAULT_HOOK_TIMEOUT, DEFAULT_LOG_HOOK_TIMEOUT, Hook, MiddlewarePipeline
+from .sync_hooks import (
+    DEFAULT_SYNC_HOOK_QUEUE_SIZE,
+    DEFAULT_SYNC_HOOK_TIMEOUT,
+    DEFAULT_SYNC_HOOK_WORKERS,
+    SyncHookExecutor,
+)
 
 
 def find_config_path() -> Optional[Path]:
@@ -38,7 +59,9 @@ def load_config(path: Optional[Path] = None) -> Optional[Dict[str, Any]]:
         path = find_config_path()
     if path is None or not path.is_file():
         return None
-    if yaml is None:
+    try:
+        import yaml
+    except ImportError:
         return None
     try:
         with open(path, encoding="utf-8") as f:
@@ -59,11 +82,34 @@ def _get_callbacks(config: Dict[str, Any]) -> List[str]:
     return [str(raw)]
 
 
+def get_litelitellm_settings(config: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Return the proxy-only litelitellm_settings section (empty dict if absent)."""
+    if not config:
+        return {}
+    settings = config.get("litelitellm_settings")
+    return settings if isinstance(settings, dict) else {}
+
+
+_HOOK_METHODS = (
+    "async_pre_call_hook",
+    "async_log_success_event",
+    "async_log_failure_event",
+    "async_should_run_agentic_loop",
+)
+
+
+def _is_callback(obj: Any, methods: Tuple[str, ...] = _HOOK_METHODS) -> bool:
+    if obj is None or isinstance(obj, type):
+        return False
+    return any(callable(getattr(obj, m, None)) for m in methods)
+
+
 def _resolve_callback(spec: str, project_root: Path) -> Optional[Any]:
     """
     Resolve one callback spec to a middleware instance.
     - "module_name.attr_name" -> import module_name, return getattr(module, attr_name)
-    - "module_name" -> import module_name, return middleware attr or first with async_pre_call_hook
+    - "module_name" -> import module_name, return middleware attr or first callback instance
+      (objects with async_pre_call_hook are preferred over logging-only callbacks)
     """
     project_root_str = str(project_root.resolve())
     if project_root_str not in sys.path:
@@ -84,48 +130,143 @@ def _resolve_callback(spec: str, project_root: Path) -> Optional[Any]:
         if spec_obj is None or spec_obj.loader is None:
             return None
         mod = importlib.util.module_from_spec(spec_obj)
+        previous = sys.modules.get(module_name)
         sys.modules[module_name] = mod
-        spec_obj.loader.exec_module(mod)
+        try:
+            spec_obj.loader.exec_module(mod)
+        except BaseException:
+            # Leave the last good module (e.g. the live generation's) importable, not a half-run one
+            if previous is not None:
+                sys.modules[module_name] = previous
+            else:
+                sys.modules.pop(module_name, None)
+            raise
         if attr_name is not None:
             return getattr(mod, attr_name, None)
-        for name in ("skills_middleware", "middleware", module_name):
-            obj = getattr(mod, name, None)
-            if obj is not None and callable(getattr(obj, "async_pre_call_hook", None)):
-                return obj
-        for name in dir(mod):
-            if name.startswith("_"):
-                continue
-            obj = getattr(mod, name, None)
-            if obj is not None and callable(getattr(obj, "async_pre_call_hook", None)):
-                return obj
+        for methods in (("async_pre_call_hook",), _HOOK_METHODS):
+            for name in ("skills_middleware", "middleware", module_name):
+                obj = getattr(mod, name, None)
+                if _is_callback(obj, methods):
+                    return obj
+            for name in dir(mod):
+                if name.startswith("_"):
+                    continue
+                obj = getattr(mod, name, None)
+                if _is_callback(obj, methods):
+                    return obj
         return None
-    except Exception:
+    except Exception as e:
+        logsink.diag(f"Failed to load callback {spec!r}: {e}")
         return None
 
 
-def load_middleware_from_config(
+def callback_module_paths(config: Optional[Dict[str, Any]], project_root: Path) -> List[Path]:
+    """Files backing each configured callback (what hot reload watches besides the config)."""
+    paths: List[Path] = []
+    for spec in _get_callbacks(config or {}):
+        spec = spec.strip()
+        if spec:
+            paths.append(project_root / f"{spec.split('.', 1)[0]}.py")
+    return paths
+
+
+def load_middlewares_from_config(
     config: Optional[Dict[str, Any]] = None,
     config_path: Optional[Path] = None,
     project_root: Optional[Path] = None,
-) -> Optional[Any]:
+) -> List[Tuple[str, Any]]:
     """
-    Load middleware from LiteLLM-style config.
-    Returns first successfully resolved callback that has async_pre_call_hook, or None.
+    Load every callback from LiteLLM-style config, in config order.
+    Returns a list of (spec, callback) for each spec that resolved.
     """
     path = config_path or find_config_path()
     if config is None:
         config = load_config(path)
     if not config:
-        return None
-    callbacks = _get_callbacks(config)
-    if not callbacks:
-        return None
+        return []
     root = project_root if project_root is not None else (path.parent if path else Path.cwd())
-    for spec in callbacks:
+    resolved: List[Tuple[str, Any]] = []
+    for spec in _get_callbacks(config):
         spec = spec.strip()
         if not spec:
             continue
-        middleware = _resolve_callback(spec, root)
-        if middleware is not None:
-            return middleware
-    return None
+        callback = _resolve_callback(spec, root)
+        if callback is None:
+            logsink.diag(f"Callback {spec!r} could not be resolved - skipping")
+            continue
+        resolved.append((spec, callback))
+    return resolved
+
+
+def load_middleware_from_config(
+    config: Optional[Dict[str, Any]] = None,
+    config_path: Optional[Path] = None,
+    project_root: Optional[Path] = None,
+) -> Optional[Any]:
+    """
+    Load middleware from LiteLLM-style config.
+    Returns first successfully resolved callback, or None. Prefer
+    load_pipeline_from_config(), which keeps every callback.
+    """
+    resolved = load_middlewares_from_config(config, config_path, project_root)
+    return resolved[0][1] if resolved else None
+
+
+def _policy_is_closed(value: Any) -> bool:
+    return str(value).strip().lower() in ("closed", "fail_closed", "fail-closed", "reject")
+
+
+def _optional_seconds(value: Any, default: float) -> Optional[float]:
+    if value is None:
+        return default
+    seconds = float(value)
+    return seconds if seconds > 0 else None
+
+
+def load_pipeline_from_config(
+    config: Optional[Dict[str, Any]] = None,
+    config_path: Optional[Path] = None,
+    project_root: Optional[Path] = None,
+) -> Optional[MiddlewarePipeline]:
+    """
+    Build a MiddlewarePipeline from every litellm_settings.callbacks entry, applying
+    litelitellm_settings hook timeouts / failure policies. Returns None if nothing resolved.
+    """
+    path = config_path or find_config_path()
+    if config is None:
+        config = load_config(path)
+    resolved = load_middlewares_from_config(config, path, project_root)
+    if not resolved:
+        return None
+    settings = get_litelitellm_settings(config)
+    default_timeout = _optional_seconds(settings.get("hook_timeout"), DEFAULT_HOOK_TIMEOUT)
+    default_log_timeout = _optional_seconds(settings.get("log_hook_timeout"), DEFAULT_LOG_HOOK_TIMEOUT)
+    default_closed = _policy_is_closed(settings.get("hook_failure_policy", "open"))
+    per_callback = settings.get("callback_settings") or {}
+    cache_entries = int(settings.get("pre_call_cache_entries", DEFAULT_MAX_ENTRIES))
+    cache_bytes = int(settings.get("pre_call_cache_bytes", DEFAULT_MAX_BYTES))
+    cache_refusals = int(settings.get("pre_call_cache_max_refusals", DEFAULT_MAX_REFUSALS))
+    cache_key_bytes = int(settings.get("pre_call_cache_max_key_bytes", DEFAULT_MAX_KEY_BYTES))
+    hooks: List[Hook] = []
+    for spec, callback in resolved:
+        overrides = per_callback.get(spec) or {}
+        memoize, fields = declared_fields(callback)
+        if "memoize" in overrides:
+            memoize = bool(overrides["memoize"])
+            fields = frozenset(overrides["memoize"]) if isinstance(overrides["memoize"], list) else None
+        hooks.append(Hook(
+            name=spec,
+            callback=callback,
+            timeout=_optional_seconds(overrides["timeout"], DEFAULT_HOOK_TIMEOUT) if "timeout" in overrides else default_timeout,
+            fail_closed=_policy_is_closed(overrides["failure_policy"]) if "failure_policy" in overrides else default_closed,
+            log_timeout=_optional_seconds(overrides["log_timeout"], DEFAULT_LOG_HOOK_TIMEOUT) if "log_timeout" in overrides else default_log_timeout,
+            memo=PreCallMemo(fields, cache_entries, cache_bytes, cache_refusals, cache_key_bytes) if memoize else None,
+        ))
+    executor = None
+    if any(h.sync_methods for h in hooks):
+        executor = SyncHookExecutor(
+            max_workers=int(settings.get("sync_hook_workers", DEFAULT_SYNC_HOOK_WORKERS)),
+            max_queue=int(settings.get("sync_hook_queue_size", DEFAULT_SYNC_HOOK_QUEUE_SIZE)),
+            timeout=_optional_seconds(settings.get("sync_hook_timeout"), DEFAULT_SYNC_HOOK_TIMEOUT),
+        )
+    return MiddlewarePipeline(hooks, executor)
@@ -0,0 +1,315 @@
+"""
+Non-blocking structured log sink.
+
+Request records and [litelitellm] diagnostics are appended to a bounded ring
+buffer (never blocking the event loop) and written in batches by a background
+thread to one or more outputs: stdout, a size/time-rotated file, and a UDP or
+unix datagram socket. When the buffer is full the oldest records are dropped
+and counted.
+
+Config (litelitellm_settings.logging):
+  buffer_size: 10000        # records held before the oldest are dropped
+  batch_size: 256           # records per write batch
+  flush_interval: 0.5       # seconds between flushes when below batch_size
+  fields: [event, model, latency_seconds, ...]   # keep only these keys (default: all)
+  extra_fields: {service: litelitellm}           # static fields added to every record
+  timestamp_field: ts       # add an ISO-8601 timestamp under this key (default: none)
+  outputs:
+    - {type: stdout}
+    - {type: file, path: logs/litelitellm.jsonl, max_bytes: 10485760, backup_count: 5, rotate_seconds: 86400}
+    - {type: udp, host: 127.0.0.1, port: 5140}
+    - {type: unix, path: /var/run/log.sock}
+"""
+
+import abc
+import atexit
+import json
+import os
+import socket
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+DEFAULT_BUFFER_SIZE = 10000
+DEFAULT_BATCH_SIZE = 256
+DEFAULT_FLUSH_INTERVAL = 0.5
+
+_EVENT = 0
+_DIAG = 1
+
+# (kind, unix time, payload) - payload is the record dict for events, the message for diagnostics
+_Item = Tuple[int, float, Any]
+# (kind, json line, human-readable text line)
+_Line = Tuple[int, str, str]
+
+
+class _Output(abc.ABC):
+    name = "output"
+
+    def __init__(self) -> None:
+        self.write_errors = 0
+
+    @abc.abstractmethod
+    def write(self, lines: List[_Line]) -> None:
+        """Write one batch; raising counts a write error for this output."""
+
+    def close(self) -> None:
+        pass
+
+
+class StdoutOutput(_Output):
+    """Request records as JSON lines; diagnostics as plain [litelitellm] lines."""
+
+    name = "stdout"
+
+    def write(self, lines: List[_Line]) -> None:
+        sys.stdout.write("".join((text if kind == _DIAG else js) + "\n" for kind, js, text in lines))
+        sys.stdout.flush()
+
+
+class FileOutput(_Output):
+    """JSON lines to a file, rotated by size and/or age (path.1 ... path.N)."""
+
+    name = "file"
+
+    def __init__(self, path: str, max_bytes: int = 0, backup_count: int = 5, rotate_seconds: float = 0) -> None:
+        super().__init__()
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.rotate_seconds = rotate_seconds
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._fh = open(self.path, "a", encoding="utf-8")
+        self._size = self._fh.tell()
+        self._opened_at = time.time()
+
+    def _rotate(self) -> None:
+        self._fh.close()
+        if self.backup_count > 0:
+            for i in range(self.backup_count - 1, 0, -1):
+                src = self.path.with_name(f"{self.path.name}.{i}")
+                if src.exists():
+                    os.replace(src, self.path.with_name(f"{self.path.name}.{i + 1}"))
+            os.replace(self.path, self.path.with_name(f"{self.path.name}.1"))
+        else:
+            self.path.unlink(missing_ok=True)
+        self._fh = open(self.path, "a", encoding="utf-8")
+        self._size = 0
+        self._opened_at = time.time()
+
+    def write(self, lines: List[_Line]) -> None:
+        data = "".join(js + "\n" for _, js, _ in lines)
+        due = self.rotate_seconds and time.time() - self._opened_at >= self.rotate_seconds
+        if self._size and (due or (self.max_bytes and self._size + len(data) > self.max_bytes)):
+            self._rotate()
+        self._fh.write(data)
+        self._fh.flush()
+        self._size += len(data)
+
+    def close(self) -> None:
+        self._fh.close()
+
+
+class DatagramOutput(_Output):
+    """One JSON record per datagram over UDP or a unix datagram socket."""
+
+    MAX_DATAGRAM = 65000
+
+    def __init__(self, address: Any, family: int) -> None:
+        super().__init__()
+        self.name = "unix" if family == getattr(socket, "AF_UNIX", None) else "udp"
+        self.address = address
+        self._sock = socket.socket(family, socket.SOCK_DGRAM)
+
+    def write(self, lines: List[_Line]) -> None:
+        for _, js, _ in lines:
+            try:
+                self._sock.sendto(js.encode("utf-8")[: self.MAX_DATAGRAM], self.address)
+            except OSError:
+                self.write_errors += 1
+
+    def close(self) -> None:
+        self._sock.close()
+
+
+def _build_output(spec: Dict[str, Any]) -> _Output:
+    kind = str(spec.get("type", "stdout")).lower()
+    if kind == "stdout":
+        return StdoutOutput()
+    if kind == "file":
+        return FileOutput(
+            spec["path"],
+            max_bytes=int(spec.get("max_bytes", 0)),
+            backup_count=int(spec.get("backup_count", 5)),
+            rotate_seconds=float(spec.get("rotate_seconds", 0)),
+        )
+    if kind == "udp":
+        return DatagramOutput((spec.get("host", "127.0.0.1"), int(spec["port"])), socket.AF_INET)
+    if kind == "unix":
+        return DatagramOutput(spec["path"], socket.AF_UNIX)
+    raise ValueError(f"unknown log output type {kind!r}")
+
+
+class LogSink:
+    """Ring buffer + background batch writer."""
+
+    def __init__(
+        self,
+        outputs: Optional[List[_Output]] = None,
+        buffer_size: int = DEFAULT_BUFFER_SIZE,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+        fields: Optional[List[str]] = None,
+        extra_fields: Optional[Dict[str, Any]] = None,
+        timestamp_field: Optional[str] = None,
+    ) -> None:
+        self.outputs = outputs if outputs is not None else [StdoutOutput()]
+        self.buffer_size = max(1, buffer_size)
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.fields = list(fields) if fields else None
+        self.extra_fields = dict(extra_fields or {})
+        self.timestamp_field = timestamp_field
+        self._buf: Deque[_Item] = deque()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._closed = False
+        self.emitted = 0
+        self.written = 0
+        self.dropped = 0
+        self._thread = threading.Thread(target=self._run, name="litelitellm-log", daemon=True)
+        self._thread.start()
+
+    @classmethod
+    def from_settings(cls, settings: Dict[str, Any]) -> "LogSink":
+        settings = settings or {}
+        outputs = [_build_output(o) for o in settings.get("outputs") or [{"type": "stdout"}]]
+        return cls(
+            outputs=outputs,
+            buffer_size=int(settings.get("buffer_size", DEFAULT_BUFFER_SIZE)),
+            batch_size=int(settings.get("batch_size", DEFAULT_BATCH_SIZE)),
+            flush_interval=float(settings.get("flush_interval", DEFAULT_FLUSH_INTERVAL)),
+            fields=settings.get("fields"),
+            extra_fields=settings.get("extra_fields"),
+            timestamp_field=settings.get("timestamp_field"),
+        )
+
+    def _append(self, item: _Item) -> None:
+        with self._lock:
+            if len(self._buf) >= self.buffer_size:
+                self._buf.popleft()
+                self.dropped += 1
+            self._buf.append(item)
+            self.emitted += 1
+            full = len(self._buf) >= self.batch_size
+        if full:
+            self._wakeup.set()
+
+    def emit(self, record: Dict[str, Any]) -> None:
+        """Queue a structured record. Never blocks on I/O; serialization happens on the writer thread."""
+        self._append((_EVENT, time.time(), record))
+
+    def diag(self, message: str) -> None:
+        """Queue a [litelitellm] diagnostic line."""
+        self._append((_DIAG, time.time(), message))
+
+    def _render(self, item: _Item) -> _Line:
+        kind, ts, payload = item
+        if kind == _DIAG:
+            record: Dict[str, Any] = {"event": "diagnostic", "message": payload}
+            text = f"[litelitellm] {payload}"
+        else:
+            record = payload if self.fields is None else {k: payload[k] for k in self.fields if k in payload}
+            text = ""
+        if self.extra_fields:
+            record = {**self.extra_fields, **record}
+        if self.timestamp_field:
+            record[self.timestamp_field] = datetime.fromtimestamp(ts, timezone.utc).isoformat()
+        return kind, json.dumps(record, default=str), text
+
+    def _run(self) -> None:
+        while not self._closed:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+    def flush(self) -> None:
+        """Write everything currently buffered, in batches."""
+        while True:
+            with self._lock:
+                if not self._buf:
+                    return
+                batch = [self._buf.popleft() for _ in range(min(self.batch_size, len(self._buf)))]
+            lines = [self._render(item) for item in batch]
+            for output in self.outputs:
+                try:
+                    output.write(lines)
+                except Exception:
+                    output.write_errors += 1
+            self.written += len(lines)
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        self._wakeup.set()
+        self._thread.join(timeout=5.0)
+        self.flush()
+        for output in self.outputs:
+            try:
+                output.close()
+            except Exception:
+                pass
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            buffered = len(self._buf)
+        return {
+            "emitted": self.emitted,
+            "written": self.written,
+            "dropped": self.dropped,
+            "buffered": buffered,
+            "write_errors": {o.name: o.write_errors for o in self.outputs},
+        }
+
+
+_sink: Optional[LogSink] = None
+_sink_lock = threading.Lock()
+
+
+def get_sink() -> LogSink:
+    global _sink
+    if _sink is None:
+        with _sink_lock:
+            if _sink is None:
+                _sink = LogSink()
+                atexit.register(_sink.close)
+    return _sink
+
+
+def configure(settings: Dict[str, Any]) -> LogSink:
+    """Replace the process-wide sink from litelitellm_settings.logging."""
+    global _sink
+    new = LogSink.from_settings(settings)
+    atexit.register(new.close)
+    with _sink_lock:
+        old, _sink = _sink, new
+    if old is not None:
+        old.close()
+    return new
+
+
+def emit(record: Dict[str, Any]) -> None:
+    get_sink().emit(record)
+
+
+def diag(message: str, exc_info: bool = False) -> None:
+    """Queue a diagnostic line; exc_info=True appends the current traceback."""
+    if exc_info:
+        message = f"{message}\n{traceback.format_exc().rstrip()}"
+    get_sink().diag(message)
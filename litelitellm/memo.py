@@ -0,0 +1,280 @@
+"""
+Memoization of pure pre-call hooks.
+
+A middleware whose async_pre_call_hook is deterministic can declare it:
+
+    class HouseStyleMiddleware:
+        litelitellm_depends_on = ["system", "tools"]    # output depends only on these fields
+        litelitellm_pure = True                         # ... or on the whole request
+
+(or via config: litelitellm_settings.callback_settings.<spec>.memoize: true | [fields]).
+The pipeline then caches what the hook changed (top-level keys set or removed),
+keyed by a hash of the fields it depends on, and applies that delta on later
+requests instead of calling the hook. A result is not cached when the hook
+rewrites an input field it did not declare (removing one is fine), adds a per-request "_" key (such as
+_skills_request_id), or returns values that are not plain JSON. After
+pre_call_cache_max_refusals such results (or oversized keys) in a row the memo
+is switched off for that hook. Middleware that tags each request with its own id (the skills
+middleware does) can therefore never be memoized.
+
+Prefer litelitellm_depends_on: a whole-request key hashes messages, images
+included, which costs time on every request and changes every turn. Keys over
+pre_call_cache_max_key_bytes are not looked up and count as refusals. Every REVIEW_EVERY lookups the
+memo is also switched off if its hit rate is under MIN_HIT_RATE or it costs
+more (hashing, diffing, applying) than the hook calls it saved.
+
+Only declared fields are compared by content. Any other field counts as
+unchanged while it is the same object the hook was given, so a memoized hook
+must assign new values rather than edit nested ones in place (with
+litelitellm_pure every field is compared this way).
+
+Config (litelitellm_settings):
+  pre_call_cache_entries: 128          # per hook
+  pre_call_cache_bytes: 67108864       # per hook, encoded delta size
+  pre_call_cache_max_refusals: 3       # uncacheable results in a row before giving up
+  pre_call_cache_max_key_bytes: 1048576  # encoded size of the fields a key is built from
+"""
+
+import hashlib
+import json
+from collections import OrderedDict
+from typing import Any, Dict, FrozenSet, Optional, Sequence, Tuple
+
+DEFAULT_MAX_ENTRIES = 128
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+DEFAULT_MAX_REFUSALS = 3
+DEFAULT_MAX_KEY_BYTES = 1024 * 1024
+
+_ABSENT = b"\x00"
+_MISSING = object()
+
+
+def _encode(value: Any) -> str:
+    """Compact JSON, key order preserved; raises TypeError for non-JSON values."""
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False)
+
+
+def declared_fields(callback: Any) -> Tuple[bool, Optional[FrozenSet[str]]]:
+    """(memoizable, fields) from the callback's litelitellm_pure / litelitellm_depends_on attributes."""
+    fields = getattr(callback, "litelitellm_depends_on", None)
+    if fields:
+        return True, frozenset(fields)
+    return bool(getattr(callback, "litelitellm_pure", False)), None
+
+
+class _Delta:
+    __slots__ = ("set_json", "removed", "size")
+
+    def __init__(self, set_json: str, removed: Tuple[str, ...]) -> None:
+        self.set_json = set_json
+        self.removed = removed
+        self.size = len(set_json)
+
+
+class PreCallMemo:
+    """Bounded LRU of pre-call deltas for one hook; fields=None means every request field."""
+
+    # Lookups between checks that the memo is paying for itself, and the hit rate it needs
+    REVIEW_EVERY = 50
+    MIN_HIT_RATE = 0.05
+
+    def __init__(
+        self,
+        fields: Optional[Sequence[str]] = None,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        max_refusals: int = DEFAULT_MAX_REFUSALS,
+        max_key_bytes: int = DEFAULT_MAX_KEY_BYTES,
+    ) -> None:
+        self.fields: Optional[Tuple[str, ...]] = tuple(sorted(fields)) if fields is not None else None
+        self._declared: FrozenSet[str] = frozenset(fields) if fields is not None else frozenset()
+        self.max_entries = max(1, int(max_entries))
+        self.max_bytes = max(1, int(max_bytes))
+        self.max_refusals = max(1, int(max_refusals))
+        self.max_key_bytes = max(1, int(max_key_bytes))
+        self.disabled: Optional[str] = None  # why the memo was switched off
+        self._refusals = 0
+        self._entries: "OrderedDict[str, _Delta]" = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.uncacheable = 0
+        self.oversized = 0
+        self.evictions = 0
+        self.hit_ms = 0.0   # key + apply
+        self.miss_ms = 0.0  # key + hook call + diff
+        self.hook_ms = 0.0  # hook calls alone
+
+    def key(self, data: Dict[str, Any]) -> Tuple[Optional[str], Dict[str, str]]:
+        """
+        Hash the dependent fields. Returns (key, encoded fields); key is None when a
+        field is not JSON-serializable or the fields encode to more than
+        max_key_bytes, in which case the hook is simply called.
+        """
+        names = self.fields if self.fields is not None else sorted(data)
+        h = hashlib.sha256()
+        encoded: Dict[str, str] = {}
+        size = 0
+        try:
+            for name in names:
+                h.update(name.encode("utf-8"))
+                if name in data:
+                    enc = encoded[name] = _encode(data[name])
+                    size += len(enc)
+                    if size > self.max_key_bytes:
+                        self.oversized += 1
+                        self._refuse("key fields over pre_call_cache_max_key_bytes; declare litelitellm_depends_on")
+                        return None, encoded
+                    h.update(b"\x01" + enc.encode("utf-8"))
+                else:
+                    h.update(_ABSENT)
+        except (TypeError, ValueError):
+            return None, encoded
+        return h.hexdigest(), encoded
+
+    def get(self, key: str) -> Optional[_Delta]:
+        delta = self._entries.get(key)
+        if delta is not None:
+            self._entries.move_to_end(key)
+        return delta
+
+    @staticmethod
+    def apply(data: Dict[str, Any], delta: _Delta) -> Dict[str, Any]:
+        """A new request dict with the cached delta applied (values are fresh copies)."""
+        out = dict(data)
+        out.update(json.loads(delta.set_json))
+        for name in delta.removed:
+            out.pop(name, None)
+        return out
+
+    def store(
+        self,
+        key: str,
+        before: Dict[str, Any],
+        encoded: Dict[str, str],
+        result: Dict[str, Any],
+    ) -> Optional[str]:
+        """
+        Cache the delta from before (the shallow copy the hook was given) to result.
+        Returns the reason it was refused, if any; too many refusals in a row set disabled.
+        """
+        delta, refused = self._diff(before, encoded, result)
+        if delta is not None:
+            self._refusals = 0
+            self._insert(key, delta)
+            return None
+        self.uncacheable += 1
+        self._refuse(refused)
+        return refused
+
+    def record_hit(self, ms: float) -> Optional[str]:
+        """Count a hit that took ms (key + apply). Returns the reason if this switched the memo off."""
+        self.hits += 1
+        self.hit_ms += ms
+        return self._review()
+
+    def record_miss(self, ms: float, hook_ms: float) -> Optional[str]:
+        """Count a miss that took ms in total, hook_ms of it in the hook. Returns the reason if this switched the memo off."""
+        self.misses += 1
+        self.miss_ms += ms
+        self.hook_ms += hook_ms
+        return self._review()
+
+    def saved_ms(self) -> float:
+        """Estimated time saved against calling the hook every time; negative when the memo costs more."""
+        if not self.misses:
+            return 0.0
+        return (self.hits + self.misses) * (self.hook_ms / self.misses) - self.hit_ms - self.miss_ms
+
+    def _review(self) -> Optional[str]:
+        lookups = self.hits + self.misses
+        if self.disabled or lookups % self.REVIEW_EVERY:
+            return None
+        if self.hits < lookups * self.MIN_HIT_RATE:
+            reason = f"hit rate {self.hits / lookups:.1%} after {lookups} lookups"
+        elif self.saved_ms() < 0:
+            reason = f"it cost {-self.saved_ms():.1f}ms more than the hook calls it saved"
+        else:
+            return None
+        self._disable(reason)
+        return reason
+
+    def _refuse(self, reason: str) -> None:
+        self._refusals += 1
+        if self._refusals >= self.max_refusals:
+            self._disable(f"{self._refusals} requests in a row could not be cached ({reason})")
+
+    def _disable(self, reason: str) -> None:
+        self.disabled = reason
+        self._entries.clear()
+        self._bytes = 0
+
+    def _diff(
+        self,
+        before: Dict[str, Any],
+        encoded: Dict[str, str],
+        result: Dict[str, Any],
+    ) -> Tuple[Optional[_Delta], Optional[str]]:
+        """(delta, None), or (None, reason) when the result cannot be cached."""
+        changed: Dict[str, str] = {}
+        for name, value in result.items():
+            prev = before.get(name, _MISSING)
+            if prev is value and name not in self._declared:
+                continue
+            if name.startswith("_"):
+                return None, f"per-request key {name}"
+            try:
+                enc = _encode(value)
+            except (TypeError, ValueError):
+                return None, f"{name} is not JSON-serializable"
+            # Dropping a key is the same whatever its value; rewriting one the hook did not declare is not
+            if self.fields is not None and prev is not _MISSING and name not in self._declared:
+                try:
+                    if _encode(prev) == enc:
+                        continue
+                except (TypeError, ValueError):
+                    pass
+                return None, f"changes undeclared field {name}"
+            if enc != encoded.get(name):
+                changed[name] = enc
+        removed = tuple(name for name in before if name not in result)
+        for name in removed:
+            if name.startswith("_"):
+                return None, f"per-request key {name}"
+        delta = _Delta("{" + ",".join(f"{_encode(k)}:{v}" for k, v in changed.items()) + "}", removed)
+        if delta.size > self.max_bytes:
+            return None, "delta larger than pre_call_cache_bytes"
+        return delta, None
+
+    def _insert(self, key: str, delta: _Delta) -> None:
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._bytes -= old.size
+        self._entries[key] = delta
+        self._bytes += delta.size
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= evicted.size
+            self.evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        avg_hit = self.hit_ms / self.hits if self.hits else 0.0
+        avg_miss = self.miss_ms / self.misses if self.misses else 0.0
+        avg_hook = self.hook_ms / self.misses if self.misses else 0.0
+        return {
+            "fields": list(self.fields) if self.fields is not None else "*",
+            "disabled": self.disabled,
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "uncacheable": self.uncacheable,
+            "oversized": self.oversized,
+            "evictions": self.evictions,
+            "avg_hit_ms": round(avg_hit, 3),
+            "avg_miss_ms": round(avg_miss, 3),
+            "avg_hook_ms": round(avg_hook, 3),
+            "saved_ms": round(self.saved_ms(), 1) + 0.0,
+        }
@@ -1,11 +1,24 @@
 """
 Lightweight request metrics and optional Langfuse tracing.
+
+Every request is logged; Langfuse export goes through sampling_policy when one
+is configured (see sampling.py).
 """
 
 import json
 import uuid
 from datetime import datetime, timedelta, timezone
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional
+
+from . import logsink
+from .sampling import SamplingPolicy
+
+sampling_policy: Optional[SamplingPolicy] = None
+
+
+def _langfuse_configured() -> bool:
+    from . import config
+    return bool(config.LANGFUSE_SECRET_KEY and config.LANGFUSE_PUBLIC_KEY and (config.LANGFUSE_BASE_URL or "").rstrip("/"))
 
 
 def record_request(
@@ -16,9 +29,13 @@ def record_request(
     input_tokens: Optional[int] = None,
     output_tokens: Optional[int] = None,
     middleware_modified: bool = False,
+    middleware_timings_ms: Optional[Dict[str, float]] = None,
+    middleware_cache_hits: Optional[List[str]] = None,
     error: Optional[str] = None,
     request_body: Optional[Dict[str, Any]] = None,
     response_body: Optional[Dict[str, Any]] = None,
+    api_key: Optional[str] = None,
+    rerouted_from: Optional[str] = None,
 ) -> None:
     payload: Dict[str, Any] = {
         "event": "proxy_request",
@@ -31,10 +48,33 @@ def record_request(
         payload["input_tokens"] = input_tokens
     if output_tokens is not None:
         payload["output_tokens"] = output_tokens
+    if middleware_timings_ms:
+        payload["middleware_timings_ms"] = middleware_timings_ms
+    if middleware_cache_hits:
+        payload["middleware_cache_hits"] = middleware_cache_hits
+    if rerouted_from:
+        payload["rerouted_from"] = rerouted_from
     if error:
         payload["error"] = error
-    print(json.dumps(payload))
+    logsink.emit(payload)
 
+    if not _langfuse_configured():
+        return
+    sample_reason, sample_rate = None, None
+    if sampling_policy is not None:
+        # Decide before building anything: unsampled requests never serialize a trace
+        sample_reason, sample_rate = sampling_policy.decide(
+            model,
+            latency_seconds,
+            api_key=api_key,
+            error=error,
+            input_tokens=input_tokens,
+            output_tokens=output_tokens,
+            middleware_modified=middleware_modified,
+            rerouted=bool(rerouted_from),
+        )
+        if sample_reason is None:
+            return
     _send_langfuse(
         endpoint=endpoint,
         model=model,
@@ -42,9 +82,13 @@ def record_request(
         input_tokens=input_tokens,
         output_tokens=output_tokens,
         middleware_modified=middleware_modified,
+        middleware_timings_ms=middleware_timings_ms,
         error=error,
         request_body=request_body,
         response_body=response_body,
+        sample_reason=sample_reason,
+        sample_rate=sample_rate,
+        rerouted_from=rerouted_from,
     )
 
 
@@ -55,16 +99,18 @@ def _send_langfuse(
     input_tokens: Optional[int] = None,
     output_tokens: Optional[int] = None,
     middleware_modified: bool = False,
+    middleware_timings_ms: Optional[Dict[str, float]] = None,
     error: Optional[str] = None,
     request_body: Optional[Dict[str, Any]] = None,
     response_body: Optional[Dict[str, Any]] = None,
+    sample_reason: Optional[str] = None,
+    sample_rate: Optional[float] = None,
+    rerouted_from: Optional[str] = None,
 ) -> None:
     from . import config
-    if not config.LANGFUSE_SECRET_KEY or not config.LANGFUSE_PUBLIC_KEY:
-        return
-    host = (config.LANGFUSE_BASE_URL or "").rstrip("/")
-    if not host:
+    if not _langfuse_configured():
         return
+    host = config.LANGFUSE_BASE_URL.rstrip("/")
 
     metadata: Dict[str, str] = {
         "endpoint": endpoint,
@@ -76,8 +122,15 @@ def _send_langfuse(
         metadata["input_tokens"] = str(input_tokens)
     if output_tokens is not None:
         metadata["output_tokens"] = str(output_tokens)
+    if middleware_timings_ms:
+        metadata["middleware_timings_ms"] = json.dumps(middleware_timings_ms)
     if error is not None:
         metadata["error"] = error
+    if rerouted_from:
+        metadata["rerouted_from"] = rerouted_from
+    if sample_reason is not None:
+        metadata["sample_reason"] = sample_reason
+        metadata["sample_rate"] = str(sample_rate)
 
     trace_input: Any = request_body if request_body is not None else {"endpoint": endpoint, "model": model}
     trace_output_meta: Dict[str, Any] = {
@@ -88,6 +141,8 @@ def _send_langfuse(
         trace_output_meta["input_tokens"] = input_tokens
     if output_tokens is not None:
         trace_output_meta["output_tokens"] = output_tokens
+    if middleware_timings_ms:
+        trace_output_meta["middleware_timings_ms"] = middleware_timings_ms
     if error is not None:
         trace_output_meta["error"] = error
     trace_output: Any = response_body if response_body is not None else trace_output_meta
@@ -114,6 +169,8 @@ def _send_langfuse(
                 "output": trace_output,
             },
         }
+        if rerouted_from:
+            trace_event["body"]["tags"] = ["rerouted"]
 
         gen_id = str(uuid.uuid4())
         gen_event_id = str(uuid.uuid4())
@@ -154,4 +211,4 @@ def _send_langfuse(
             )
             resp.raise_for_status()
     except Exception as e:
-        print(f"[litelitellm] Langfuse trace failed: {e}", flush=True)
+        logsink.diag(f"Langfuse trace failed: {e}")
@@ -0,0 +1,349 @@
+"""
+Ordered middleware pipeline built from every litellm_settings.callbacks entry.
+
+Pre-call hooks run in sequence (each sees the previous hook's output) with a
+per-hook timeout and a fail-open / fail-closed policy. Logging callbacks fan out
+concurrently. Per-hook latency is recorded per request and aggregated.
+
+Pre-call hooks declared pure are memoized (see memo.py).
+
+Notification-only hooks (sync CustomLogger methods, async_log_pre_api_call,
+async_log_stream_event, async_post_call_success_hook) are dispatched in the
+background so they never add latency to the response path.
+"""
+
+import asyncio
+import time
+from typing import Any, Dict, List, Optional, Set
+
+from . import logsink
+from .memo import PreCallMemo
+from .shim import CustomLogger
+from .sync_hooks import SyncHookExecutor, overridden_sync_methods
+
+DEFAULT_HOOK_TIMEOUT = 30.0
+DEFAULT_LOG_HOOK_TIMEOUT = 10.0
+
+
+class MiddlewareError(Exception):
+    """Raised when a fail-closed pre-call hook errors or times out."""
+
+
+class _LatencyStats:
+    __slots__ = ("calls", "errors", "timeouts", "total_ms", "max_ms")
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def add(self, ms: float) -> None:
+        self.calls += 1
+        self.total_ms += ms
+        if ms > self.max_ms:
+            self.max_ms = ms
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "timeouts": self.timeouts,
+            "avg_ms": round(self.total_ms / self.calls, 3) if self.calls else 0.0,
+            "max_ms": round(self.max_ms, 3),
+        }
+
+
+class Hook:
+    """One resolved callback plus its policy and latency counters."""
+
+    def __init__(
+        self,
+        name: str,
+        callback: Any,
+        timeout: Optional[float] = DEFAULT_HOOK_TIMEOUT,
+        fail_closed: bool = False,
+        log_timeout: Optional[float] = DEFAULT_LOG_HOOK_TIMEOUT,
+        memo: Optional[PreCallMemo] = None,
+    ) -> None:
+        self.name = name
+        self.callback = callback
+        self.timeout = timeout
+        self.fail_closed = fail_closed
+        self.log_timeout = log_timeout
+        self.memo = memo
+        self._warned_uncacheable = False
+        self.sync_methods = overridden_sync_methods(callback)
+        self.stats: Dict[str, _LatencyStats] = {}
+
+    def __repr__(self) -> str:
+        policy = "closed" if self.fail_closed else "open"
+        return f"<Hook {self.name} timeout={self.timeout} fail={policy}>"
+
+    def has(self, method: str) -> bool:
+        return callable(getattr(self.callback, method, None))
+
+    def implements(self, method: str) -> bool:
+        """Like has(), but False when the method is CustomLogger's no-op stub."""
+        bound = getattr(self.callback, method, None)
+        if not callable(bound):
+            return False
+        return getattr(bound, "__func__", bound) is not getattr(CustomLogger, method, None)
+
+    def phase(self, method: str) -> _LatencyStats:
+        stats = self.stats.get(method)
+        if stats is None:
+            stats = self.stats[method] = _LatencyStats()
+        return stats
+
+
+class MiddlewarePipeline:
+    """Runs the configured hooks in config order."""
+
+    def __init__(self, hooks: List[Hook], executor: Optional[SyncHookExecutor] = None) -> None:
+        self.hooks = hooks
+        if executor is None and any(h.sync_methods for h in hooks):
+            executor = SyncHookExecutor()
+        self.executor = executor
+        self._background: Set[asyncio.Task] = set()
+        self.generation = 0
+        self.in_flight = 0
+
+    def __repr__(self) -> str:
+        return f"<MiddlewarePipeline gen={self.generation} [{', '.join(h.name for h in self.hooks)}]>"
+
+    def acquire(self) -> None:
+        """Mark a request as running on this pipeline (see reload.ConfigWatcher)."""
+        self.in_flight += 1
+
+    def release(self) -> None:
+        self.in_flight -= 1
+
+    def __len__(self) -> int:
+        return len(self.hooks)
+
+    async def run_pre_call(
+        self,
+        data: Dict[str, Any],
+        timings: Optional[Dict[str, float]] = None,
+        cache_hits: Optional[List[str]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Run every async_pre_call_hook in order, feeding each the previous result.
+        Each hook gets its own shallow copy of the request, so when a fail-open
+        hook errors or times out its top-level changes are discarded and the
+        previous result carries on; in-place edits to nested values (e.g.
+        appending to data["messages"]) cannot be rolled back. Fail-closed hooks
+        raise MiddlewareError. Memoized hooks whose inputs were seen before are
+        not called; their names go into cache_hits.
+        """
+        for hook in self.hooks:
+            if not hook.has("async_pre_call_hook"):
+                continue
+            memo = hook.memo if hook.memo is not None and not hook.memo.disabled else None
+            key = None
+            if memo is not None:
+                t0 = time.perf_counter()
+                key, encoded = memo.key(data)
+                delta = memo.get(key) if key is not None else None
+                if delta is not None:
+                    data = memo.apply(data, delta)
+                    ms = (time.perf_counter() - t0) * 1000.0
+                    if timings is not None:
+                        timings[hook.name] = round(ms, 3)
+                    if cache_hits is not None:
+                        cache_hits.append(hook.name)
+                    self._memo_disabled(hook, memo.record_hit(ms))
+                    continue
+                key_ms = (time.perf_counter() - t0) * 1000.0
+                if memo.disabled:
+                    # The key was over pre_call_cache_max_key_bytes once too often
+                    self._memo_disabled(hook, memo.disabled)
+            stats = hook.phase("async_pre_call_hook")
+            attempt = dict(data)
+            t0 = time.perf_counter()
+            try:
+                result = await asyncio.wait_for(
+                    hook.callback.async_pre_call_hook(
+                        user_api_key_dict=None,
+                        cache=None,
+                        data=attempt,
+                        call_type="anthropic_messages",
+                    ),
+                    timeout=hook.timeout,
+                )
+            except asyncio.TimeoutError:
+                stats.timeouts += 1
+                self._record(hook, stats, t0, timings)
+                msg = f"pre_call_hook {hook.name} timed out after {hook.timeout}s"
+                if hook.fail_closed:
+                    raise MiddlewareError(msg)
+                logsink.diag(f"Middleware {msg} (fail-open, skipping)")
+                continue
+            except Exception as e:
+                stats.errors += 1
+                self._record(hook, stats, t0, timings)
+                if hook.fail_closed:
+                    raise MiddlewareError(f"pre_call_hook {hook.name} failed: {e}") from e
+                logsink.diag(f"Middleware {hook.name} pre_call_hook error: {e}", exc_info=True)
+                continue
+            ms = self._record(hook, stats, t0, timings)
+            # The hook was handed a copy, so data is still the request it saw
+            before = data
+            data = result if result is not None else attempt
+            if memo is not None:
+                t1 = time.perf_counter()
+                refused = memo.store(key, before, encoded, data) if key is not None else None
+                diff_ms = (time.perf_counter() - t1) * 1000.0
+                if refused is not None and memo.disabled:
+                    self._memo_disabled(hook, memo.disabled)
+                elif refused is not None and not hook._warned_uncacheable:
+                    hook._warned_uncacheable = True
+                    logsink.diag(f"Middleware {hook.name} is declared pure but its result was not cached: {refused}")
+                self._memo_disabled(hook, memo.record_miss(key_ms + ms + diff_ms, ms))
+        return data
+
+    @staticmethod
+    def _memo_disabled(hook: Hook, reason: Optional[str]) -> None:
+        if reason is not None:
+            logsink.diag(f"Middleware {hook.name}: pre-call memoization disabled, {reason}")
+
+    async def run_agentic_loop(self, response: Any, data: Dict[str, Any]) -> Optional[Any]:
+        """Give each hook a chance to run its agentic loop; the first one that opts in wins."""
+        for hook in self.hooks:
+            if not hook.has("async_should_run_agentic_loop"):
+                continue
+            should_run, loop_ctx = await hook.callback.async_should_run_agentic_loop(
+                response=response,
+                model=data.get("model", ""),
+                messages=data.get("messages", []),
+                tools=data.get("tools"),
+                stream=False,
+                custom_llm_provider="anthropic",
+                kwargs={},
+            )
+            if not should_run or not hook.has("async_run_agentic_loop"):
+                continue
+            stats = hook.phase("async_run_agentic_loop")
+            t0 = time.perf_counter()
+            try:
+                return await hook.callback.async_run_agentic_loop(
+                    tools=loop_ctx,
+                    model=data.get("model", ""),
+                    messages=data.get("messages", []),
+                    response=response,
+                    anthropic_messages_provider_config=None,
+                    anthropic_messages_optional_request_params={k: v for k, v in data.items() if k not in ("messages", "model")},
+                    logging_obj=None,
+                    stream=False,
+                    kwargs={},
+                )
+            except Exception:
+                stats.errors += 1
+                raise
+            finally:
+                self._record(hook, stats, t0)
+        return None
+
+    async def log_success(self, **kwargs: Any) -> None:
+        await self._fan_out("async_log_success_event", kwargs)
+
+    async def log_failure(self, **kwargs: Any) -> None:
+        await self._fan_out("async_log_failure_event", kwargs)
+
+    def on_pre_api_call(self, model: str, messages: Any, kwargs: Dict[str, Any]) -> None:
+        """Notify hooks that the upstream call is about to be made. Does not wait."""
+        self._dispatch_sync("log_pre_api_call", model, messages, kwargs)
+        self._background_fan_out("async_log_pre_api_call", {"model": model, "messages": messages, "kwargs": kwargs})
+
+    def on_success(
+        self,
+        kwargs: Dict[str, Any],
+        response_obj: Any,
+        start_time: Any,
+        end_time: Any,
+        data: Dict[str, Any],
+        stream: bool = False,
+    ) -> None:
+        """Background success notifications (sync success/stream events, post-call hooks). Does not wait."""
+        self._dispatch_sync("log_success_event", kwargs, response_obj, start_time, end_time)
+        log_kwargs = {"kwargs": kwargs, "response_obj": response_obj, "start_time": start_time, "end_time": end_time}
+        if stream:
+            self._dispatch_sync("log_stream_event", kwargs, response_obj, start_time, end_time)
+            self._background_fan_out("async_log_stream_event", log_kwargs)
+        self._background_fan_out(
+            "async_post_call_success_hook",
+            {"data": data, "user_api_key_dict": None, "response": response_obj},
+        )
+
+    def on_failure(self, kwargs: Dict[str, Any], response_obj: Any, start_time: Any, end_time: Any) -> None:
+        """Background failure notifications for sync hooks. Does not wait."""
+        self._dispatch_sync("log_failure_event", kwargs, response_obj, start_time, end_time)
+
+    def _dispatch_sync(self, method: str, *args: Any) -> None:
+        if self.executor is None:
+            return
+        for hook in self.hooks:
+            if method in hook.sync_methods:
+                if not self.executor.submit(f"{hook.name}.{method}", getattr(hook.callback, method), *args):
+                    hook.phase(method).errors += 1
+
+    def _background_fan_out(self, method: str, kwargs: Dict[str, Any]) -> None:
+        hooks = [hook for hook in self.hooks if hook.implements(method)]
+        if not hooks:
+            return
+        task = asyncio.get_running_loop().create_task(self._fan_out(method, kwargs, hooks))
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    async def _fan_out(self, method: str, kwargs: Dict[str, Any], hooks: Optional[List[Hook]] = None) -> None:
+        """Call method on every hook that has it, concurrently. Errors are swallowed."""
+        if hooks is None:
+            hooks = [hook for hook in self.hooks if hook.has(method)]
+        calls = [self._call_logging(hook, method, kwargs) for hook in hooks]
+        if calls:
+            await asyncio.gather(*calls)
+
+    async def _call_logging(self, hook: Hook, method: str, kwargs: Dict[str, Any]) -> None:
+        stats = hook.phase(method)
+        t0 = time.perf_counter()
+        try:
+            await asyncio.wait_for(getattr(hook.callback, method)(**kwargs), timeout=hook.log_timeout)
+        except asyncio.TimeoutError:
+            stats.timeouts += 1
+        except Exception:
+            stats.errors += 1
+        finally:
+            self._record(hook, stats, t0)
+
+    @staticmethod
+    def _record(hook: Hook, stats: _LatencyStats, t0: float, timings: Optional[Dict[str, float]] = None) -> float:
+        ms = (time.perf_counter() - t0) * 1000.0
+        stats.add(ms)
+        if timings is not None:
+            timings[hook.name] = round(ms, 3)
+        return ms
+
+    def stats(self) -> Dict[str, Any]:
+        """Aggregated per-hook, per-phase latency and pre-call cache counters, plus sync hook executor counters."""
+        out: Dict[str, Any] = {
+            hook.name: {
+                "timeout": hook.timeout,
+                "failure_policy": "closed" if hook.fail_closed else "open",
+                "sync_hooks": sorted(hook.sync_methods),
+                "phases": {method: s.as_dict() for method, s in hook.stats.items()},
+            }
+            for hook in self.hooks
+        }
+        for hook in self.hooks:
+            if hook.memo is not None:
+                out[hook.name]["pre_call_cache"] = hook.memo.stats()
+        if self.executor is not None:
+            out["_sync_executor"] = self.executor.stats()
+        out["_generation"] = {"generation": self.generation, "in_flight": self.in_flight}
+        return out
+
+    def close(self) -> None:
+        if self.executor is not None:
+            self.executor.shutdown()
@@ -0,0 +1,146 @@
+"""
+Hot reload of config and middleware without dropping in-flight requests.
+
+ConfigWatcher polls the config file and each callback's module file. When one
+changes it re-resolves every callback into a new MiddlewarePipeline generation
+and swaps it into server.middleware. Requests capture the pipeline they started
+with, so in-flight requests (including long streams) finish on the old
+generation; the old generation's sync-hook pool is closed once it drains.
+
+Only the top-level callback modules are re-executed; helper modules they import
+stay cached in sys.modules until restart. Unlike at startup, that re-execution
+runs on a worker thread (asyncio.to_thread) so a slow import does not stall
+requests: module top-level code must not assume the main thread or a running
+event loop (signal handlers, asyncio.get_event_loop(), ...). A module that
+fails to execute leaves the previous one in sys.modules. Other
+litelitellm_settings sections (compression, blob_dedup, ...) still require a
+restart.
+"""
+
+import asyncio
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Set
+
+from . import logsink
+from .config_loader import _get_callbacks, callback_module_paths, load_config, load_pipeline_from_config
+from .pipeline import MiddlewarePipeline
+
+DEFAULT_POLL_INTERVAL = 1.0
+DRAIN_TIMEOUT_SECONDS = 600.0
+
+
+class ConfigWatcher:
+    """Polls config + middleware files and swaps in new pipeline generations."""
+
+    def __init__(
+        self,
+        config_path: Path,
+        get_current: Callable[[], Optional[MiddlewarePipeline]],
+        set_current: Callable[[Optional[MiddlewarePipeline]], None],
+        interval: float = DEFAULT_POLL_INTERVAL,
+    ) -> None:
+        self.config_path = config_path
+        self.project_root = config_path.parent
+        self._get_current = get_current
+        self._set_current = set_current
+        self.interval = interval
+        self.generation = 0
+        self.reloads = 0
+        self.failed_reloads = 0
+        self._mtimes: Dict[Path, Optional[float]] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._draining: Set[asyncio.Task] = set()
+        current = get_current()
+        if current is not None:
+            current.generation = self.generation
+        self._mtimes = self._snapshot(load_config(config_path))
+
+    def _watched(self, config: Optional[Dict[str, Any]]) -> List[Path]:
+        return [self.config_path] + callback_module_paths(config, self.project_root)
+
+    def _snapshot(self, config: Optional[Dict[str, Any]]) -> Dict[Path, Optional[float]]:
+        out: Dict[Path, Optional[float]] = {}
+        for path in self._watched(config):
+            try:
+                out[path] = path.stat().st_mtime
+            except OSError:
+                out[path] = None
+        return out
+
+    def _changed(self) -> bool:
+        for path, mtime in self._mtimes.items():
+            try:
+                current = path.stat().st_mtime
+            except OSError:
+                current = None
+            if current != mtime:
+                return True
+        return False
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            if not self._changed():
+                continue
+            try:
+                await self.reload()
+            except Exception as e:
+                self.failed_reloads += 1
+                logsink.diag(f"Reload failed, keeping generation {self.generation}: {e}")
+
+    async def reload(self) -> bool:
+        """Build a new generation and swap it in. Returns False if the old one was kept."""
+        t0 = time.perf_counter()
+        config = await asyncio.to_thread(load_config, self.config_path)
+        # Record mtimes before resolving so an edit made during the reload triggers another one
+        self._mtimes = self._snapshot(config)
+        if config is None:
+            self.failed_reloads += 1
+            logsink.diag(f"Reload skipped: could not parse {self.config_path}")
+            return False
+        pipeline = await asyncio.to_thread(load_pipeline_from_config, config, self.config_path)
+        expected = len([s for s in _get_callbacks(config) if s.strip()])
+        if len(pipeline or ()) != expected:
+            if pipeline is not None:
+                pipeline.close()
+            self.failed_reloads += 1
+            logsink.diag(f"Reload skipped: {len(pipeline or ())}/{expected} callbacks resolved, keeping generation {self.generation}")
+            return False
+        self.generation += 1
+        self.reloads += 1
+        if pipeline is not None:
+            pipeline.generation = self.generation
+        old = self._get_current()
+        self._set_current(pipeline)
+        ms = (time.perf_counter() - t0) * 1000.0
+        logsink.diag(f"Reloaded middleware generation {self.generation} in {ms:.1f}ms -> {pipeline}")
+        if old is not None:
+            task = asyncio.get_running_loop().create_task(self._drain(old))
+            self._draining.add(task)
+            task.add_done_callback(self._draining.discard)
+        return True
+
+    async def _drain(self, old: MiddlewarePipeline) -> None:
+        deadline = time.monotonic() + DRAIN_TIMEOUT_SECONDS
+        while old.in_flight > 0 and time.monotonic() < deadline:
+            await asyncio.sleep(self.interval)
+        old.close()
+        logsink.diag(f"Middleware generation {old.generation} retired ({old.in_flight} still in flight)")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "generation": self.generation,
+            "reloads": self.reloads,
+            "failed_reloads": self.failed_reloads,
+            "draining": len(self._draining),
+        }
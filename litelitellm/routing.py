@@ -0,0 +1,268 @@
+"""
+Latency-SLO-driven model fallback.
+
+For every model covered by a rule, SloRouter keeps EWMAs of time to first token
+(first content delta of a stream) and of the upstream error rate, fed by the
+traffic the proxy already handles. When the model breaches its SLO, eligible
+requests for it are rewritten to the rule's fallback model. Switching back
+needs the primary to be degraded for at least hold_seconds and back under the
+(lower) recover thresholds, which only probes can show: while degraded,
+probe_rate of eligible requests still go to the primary so its EWMAs keep
+moving, and once the primary has gone hold_seconds without a sample the next
+eligible request is sent to it regardless (so probe_rate: 0 still recovers,
+just slowly). Rerouted requests carry rerouted_from in the request log and
+Langfuse trace.
+
+Config (litelitellm_settings.slo_routing):
+  enabled: true
+  ewma_alpha: 0.1                  # weight of each new sample
+  error_types: [overloaded_error, api_error, connection_error]
+  rules:
+    - model: claude-opus-4-1       # exact name or fnmatch pattern
+      fallback: claude-sonnet-4-5
+      max_ttft_ms: 4000            # breach above this TTFT EWMA
+      max_error_rate: 0.2          # breach above this error-rate EWMA
+      recover_ttft_ms: 2500        # default 0.75 x max_ttft_ms
+      recover_error_rate: 0.05     # default 0.5 x max_error_rate
+      min_samples: 20              # samples before a breach can trigger
+      hold_seconds: 60             # minimum time on the fallback
+      probe_rate: 0.05             # share of eligible requests still sent to the primary (0-1)
+      streams_only: true           # only reroute streaming (interactive) requests
+"""
+
+import json
+import random
+import time
+from fnmatch import fnmatchcase
+from typing import Any, Dict, FrozenSet, List, Optional, Tuple
+
+from . import logsink
+
+DEFAULT_EWMA_ALPHA = 0.1
+DEFAULT_ERROR_TYPES = ("overloaded_error", "api_error", "connection_error")
+DEFAULT_MIN_SAMPLES = 20
+DEFAULT_HOLD_SECONDS = 60.0
+DEFAULT_PROBE_RATE = 0.05
+
+_MAX_CACHED_MODELS = 1024
+_ERROR_EVENT = b"event: error"
+_STATUS_ERROR_TYPES = {429: "rate_limit_error", 500: "api_error", 502: "api_error", 503: "api_error", 504: "api_error", 529: "overloaded_error"}
+
+
+def error_from_event(chunk: bytes) -> Optional[Tuple[str, str]]:
+    """(error.type, error.message) of an SSE error event in chunk, if there is one."""
+    if chunk.startswith(_ERROR_EVENT):
+        start = 0
+    else:
+        # Only at the start of a line, never inside a JSON data payload
+        start = chunk.find(b"\n" + _ERROR_EVENT)
+        if start < 0:
+            return None
+    data_at = chunk.find(b"data:", start)
+    if data_at < 0:
+        return "api_error", "malformed error event"
+    end = chunk.find(b"\n", data_at)
+    raw = chunk[data_at + 5: end if end >= 0 else len(chunk)]
+    try:
+        error = json.loads(raw).get("error") or {}
+        return str(error.get("type") or "api_error"), str(error.get("message") or "")
+    except (ValueError, AttributeError):
+        return "api_error", raw.decode("utf-8", "replace").strip()
+
+
+def error_type_from_exception(e: BaseException) -> str:
+    """Map an upstream exception to an Anthropic error type ("connection_error" when there was no response)."""
+    response = getattr(e, "response", None)
+    status = getattr(response, "status_code", None)
+    if status is None:
+        return "connection_error"
+    try:
+        return str(response.json()["error"]["type"])
+    except Exception:
+        return _STATUS_ERROR_TYPES.get(status, "api_error" if status >= 500 else "invalid_request_error")
+
+
+class _ModelHealth:
+    __slots__ = ("ttft_ms", "ttft_samples", "error_rate", "samples", "last_sample")
+
+    def __init__(self) -> None:
+        self.ttft_ms = 0.0
+        self.ttft_samples = 0
+        self.error_rate = 0.0
+        self.samples = 0
+        self.last_sample = 0.0
+
+    def add(self, alpha: float, ttft_ms: Optional[float], failed: bool) -> None:
+        # Seed the EWMA with the first sample instead of decaying up from zero
+        self.error_rate = float(failed) if self.samples == 0 else self.error_rate + alpha * (failed - self.error_rate)
+        self.samples += 1
+        self.last_sample = time.monotonic()
+        if ttft_ms is not None:
+            self.ttft_ms = ttft_ms if self.ttft_samples == 0 else self.ttft_ms + alpha * (ttft_ms - self.ttft_ms)
+            self.ttft_samples += 1
+
+
+class SloRule:
+    """One primary model (or pattern), its fallback and thresholds."""
+
+    def __init__(
+        self,
+        model: str,
+        fallback: str,
+        max_ttft_ms: Optional[float] = None,
+        max_error_rate: Optional[float] = None,
+        recover_ttft_ms: Optional[float] = None,
+        recover_error_rate: Optional[float] = None,
+        min_samples: int = DEFAULT_MIN_SAMPLES,
+        hold_seconds: float = DEFAULT_HOLD_SECONDS,
+        probe_rate: float = DEFAULT_PROBE_RATE,
+        streams_only: bool = False,
+    ) -> None:
+        self.model = model
+        self.fallback = fallback
+        self.max_ttft_ms = max_ttft_ms
+        self.max_error_rate = max_error_rate
+        self.recover_ttft_ms = recover_ttft_ms if recover_ttft_ms is not None else (max_ttft_ms * 0.75 if max_ttft_ms is not None else None)
+        self.recover_error_rate = recover_error_rate if recover_error_rate is not None else (max_error_rate * 0.5 if max_error_rate is not None else None)
+        self.min_samples = max(1, int(min_samples))
+        if not 0.0 <= probe_rate <= 1.0:
+            raise ValueError(f"probe_rate for {model} must be between 0 and 1, got {probe_rate}")
+        self.hold_seconds = hold_seconds
+        self.probe_rate = probe_rate
+        self.streams_only = streams_only
+
+    @classmethod
+    def from_dict(cls, spec: Dict[str, Any]) -> "SloRule":
+        def opt(name: str) -> Optional[float]:
+            return float(spec[name]) if spec.get(name) is not None else None
+
+        return cls(
+            model=str(spec["model"]),
+            fallback=str(spec["fallback"]),
+            max_ttft_ms=opt("max_ttft_ms"),
+            max_error_rate=opt("max_error_rate"),
+            recover_ttft_ms=opt("recover_ttft_ms"),
+            recover_error_rate=opt("recover_error_rate"),
+            min_samples=int(spec.get("min_samples", DEFAULT_MIN_SAMPLES)),
+            hold_seconds=float(spec.get("hold_seconds", DEFAULT_HOLD_SECONDS)),
+            probe_rate=float(spec.get("probe_rate", DEFAULT_PROBE_RATE)),
+            streams_only=bool(spec.get("streams_only", False)),
+        )
+
+    def matches(self, model: str) -> bool:
+        return model == self.model or fnmatchcase(model, self.model)
+
+    def breach(self, h: _ModelHealth) -> Optional[str]:
+        if self.max_error_rate is not None and h.samples >= self.min_samples and h.error_rate > self.max_error_rate:
+            return f"error rate {h.error_rate:.2f} > {self.max_error_rate}"
+        if self.max_ttft_ms is not None and h.ttft_samples >= self.min_samples and h.ttft_ms > self.max_ttft_ms:
+            return f"TTFT {h.ttft_ms:.0f}ms > {self.max_ttft_ms:.0f}ms"
+        return None
+
+    def recovered(self, h: _ModelHealth) -> bool:
+        if self.recover_error_rate is not None and h.error_rate > self.recover_error_rate:
+            return False
+        if self.recover_ttft_ms is not None and h.ttft_samples and h.ttft_ms > self.recover_ttft_ms:
+            return False
+        return True
+
+
+class SloRouter:
+    """Tracks model health and picks fallbacks; see module docstring."""
+
+    def __init__(
+        self,
+        rules: List[SloRule],
+        ewma_alpha: float = DEFAULT_EWMA_ALPHA,
+        error_types: Optional[List[str]] = None,
+    ) -> None:
+        self.rules = rules
+        self.alpha = ewma_alpha
+        self.error_types: FrozenSet[str] = frozenset(error_types if error_types is not None else DEFAULT_ERROR_TYPES)
+        self._health: Dict[str, _ModelHealth] = {}
+        self._rule_for: Dict[str, Optional[SloRule]] = {}
+        # model -> monotonic time it was marked degraded
+        self._degraded: Dict[str, float] = {}
+        self.rerouted: Dict[str, int] = {}
+        self.probes = 0
+        self.switches = 0
+
+    @classmethod
+    def from_settings(cls, settings: Dict[str, Any]) -> Optional["SloRouter"]:
+        """Build from the slo_routing settings section; None unless enabled with at least one rule."""
+        if not settings or not settings.get("enabled") or not settings.get("rules"):
+            return None
+        return cls(
+            rules=[SloRule.from_dict(r) for r in settings["rules"]],
+            ewma_alpha=float(settings.get("ewma_alpha", DEFAULT_EWMA_ALPHA)),
+            error_types=settings.get("error_types"),
+        )
+
+    def rule_for(self, model: str) -> Optional[SloRule]:
+        if model not in self._rule_for:
+            if len(self._rule_for) >= _MAX_CACHED_MODELS:
+                self._rule_for.clear()
+            self._rule_for[model] = next((r for r in self.rules if r.matches(model)), None)
+        return self._rule_for[model]
+
+    def route(self, model: str, stream: bool) -> Optional[str]:
+        """The model to send this request to instead of model, or None to keep it."""
+        if model not in self._degraded:
+            return None
+        rule = self.rule_for(model)
+        if rule is None or (rule.streams_only and not stream):
+            return None
+        if rule.fallback in self._degraded:
+            # Never chain onto a fallback that is itself failing its SLO
+            return None
+        if rule.probe_rate > 0 and random.random() < rule.probe_rate:
+            self.probes += 1
+            return None
+        # Recovery is only judged on primary samples; make sure one arrives every hold_seconds
+        health = self._health[model]
+        now = time.monotonic()
+        if now - max(self._degraded[model], health.last_sample) >= rule.hold_seconds:
+            # Counts as a sample so only one forced probe goes out per hold_seconds
+            health.last_sample = now
+            self.probes += 1
+            return None
+        self.rerouted[model] = self.rerouted.get(model, 0) + 1
+        return rule.fallback
+
+    def observe(self, model: str, ttft_ms: Optional[float] = None, error_type: Optional[str] = None) -> None:
+        """Record one finished upstream call for model (the model actually called)."""
+        rule = self.rule_for(model)
+        if rule is None:
+            return
+        health = self._health.get(model)
+        if health is None:
+            health = self._health[model] = _ModelHealth()
+        health.add(self.alpha, ttft_ms, error_type in self.error_types)
+        since = self._degraded.get(model)
+        if since is None:
+            reason = rule.breach(health)
+            if reason is not None:
+                self._degraded[model] = time.monotonic()
+                self.switches += 1
+                logsink.diag(f"SLO breached for {model} ({reason}); routing eligible requests to {rule.fallback}")
+        elif time.monotonic() - since >= rule.hold_seconds and rule.recovered(health):
+            del self._degraded[model]
+            self.switches += 1
+            logsink.diag(f"{model} recovered (TTFT {health.ttft_ms:.0f}ms, error rate {health.error_rate:.2f}); routing back")
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        return {
+            "models": {
+                model: {
+                    "ttft_ms": round(h.ttft_ms, 1),
+                    "error_rate": round(h.error_rate, 4),
+                    "samples": h.samples,
+                    "degraded_seconds": round(now - self._degraded[model], 1) if model in self._degraded else None,
+                }
+                for model, h in self._health.items()
+            },
+            "rerouted": dict(self.rerouted),
+            "probes": self.probes,
+            "switches": self.switches,
+        }
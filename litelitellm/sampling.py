@@ -0,0 +1,224 @@
+"""
+Head- and tail-based sampling for Langfuse trace export.
+
+Each finished request gets one export decision, made before any trace payload
+is built. Tail rules force export when the outcome is interesting; otherwise
+the request is exported with its head rate, the first match among api_keys,
+models, then rate. Exported traces carry sample_reason and sample_rate metadata
+so head-sampled counts can be scaled back up.
+
+Config (litelitellm_settings.trace_sampling):
+  enabled: true
+  rate: 0.1                          # default head rate
+  models: {claude-haiku-*: 0.01}     # exact name or fnmatch pattern
+  api_keys: {"sha256:3f2a9c...": 1}  # raw key, or sha256: + hex digest (or a prefix of it)
+  always_export:
+    errors: true
+    latency_percentile: 99           # slower than this rolling per-model percentile
+    latency_window: 1000             # samples per model for the percentile
+    latency_min_samples: 100         # no latency rule until a model has this many
+    min_total_tokens: 100000         # input + output tokens
+    middleware_modified: false
+    rerouted: true                   # requests moved to a fallback model (see routing.py)
+"""
+
+import hashlib
+import random
+import threading
+from collections import deque
+from fnmatch import fnmatchcase
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+DEFAULT_RATE = 1.0
+DEFAULT_LATENCY_WINDOW = 1000
+DEFAULT_LATENCY_MIN_SAMPLES = 100
+_MAX_CACHED_KEYS = 4096
+# Model names come from clients; bound what is kept per name
+_MAX_CACHED_MODELS = 1024
+
+
+class _LatencyWindow:
+    """Rolling latencies for one model with a percentile threshold refreshed every few samples."""
+
+    __slots__ = ("samples", "threshold", "_since_refresh")
+
+    def __init__(self, size: int) -> None:
+        self.samples: Deque[float] = deque(maxlen=size)
+        self.threshold: Optional[float] = None
+        self._since_refresh = 0
+
+    def add(self, latency: float, percentile: float, min_samples: int) -> None:
+        self.samples.append(latency)
+        self._since_refresh += 1
+        n = len(self.samples)
+        # Sorting the whole window per request is wasteful; refresh after ~2% of it has turned over
+        if n >= min_samples and (self.threshold is None or self._since_refresh >= max(1, n // 50)):
+            ordered = sorted(self.samples)
+            self.threshold = ordered[min(n - 1, int(n * percentile / 100.0))]
+            self._since_refresh = 0
+
+
+class SamplingPolicy:
+    """Decides which requests are exported as traces; see module docstring."""
+
+    def __init__(
+        self,
+        rate: float = DEFAULT_RATE,
+        models: Optional[Dict[str, float]] = None,
+        api_keys: Optional[Dict[str, float]] = None,
+        errors: bool = True,
+        latency_percentile: Optional[float] = None,
+        latency_window: int = DEFAULT_LATENCY_WINDOW,
+        latency_min_samples: int = DEFAULT_LATENCY_MIN_SAMPLES,
+        min_total_tokens: Optional[int] = None,
+        middleware_modified: bool = False,
+        rerouted: bool = True,
+    ) -> None:
+        self.rate = float(rate)
+        self._model_exact: Dict[str, float] = {}
+        self._model_patterns: List[Tuple[str, float]] = []
+        for name, value in (models or {}).items():
+            if any(c in name for c in "*?["):
+                self._model_patterns.append((name, float(value)))
+            else:
+                self._model_exact[name] = float(value)
+        self._key_raw: Dict[str, float] = {}
+        self._key_digests: List[Tuple[str, float]] = []
+        for key, value in (api_keys or {}).items():
+            if key.startswith("sha256:"):
+                self._key_digests.append((key[len("sha256:"):].lower(), float(value)))
+            else:
+                self._key_raw[key] = float(value)
+        self.errors = errors
+        self.latency_percentile = latency_percentile
+        self.latency_window = max(1, int(latency_window))
+        self.latency_min_samples = max(1, int(latency_min_samples))
+        self.min_total_tokens = min_total_tokens
+        self.middleware_modified = middleware_modified
+        self.rerouted = rerouted
+        self._model_rates: Dict[str, float] = {}
+        self._key_rates: Dict[str, Optional[float]] = {}
+        self._latency: Dict[str, _LatencyWindow] = {}
+        self._lock = threading.Lock()
+        self.decisions = 0
+        self.exported: Dict[str, int] = {}
+        self.skipped = 0
+
+    @classmethod
+    def from_settings(cls, settings: Dict[str, Any]) -> Optional["SamplingPolicy"]:
+        """Build from the trace_sampling settings section; None unless enabled."""
+        if not settings or not settings.get("enabled"):
+            return None
+        tail = settings.get("always_export") or {}
+        percentile = tail.get("latency_percentile")
+        min_tokens = tail.get("min_total_tokens")
+        return cls(
+            rate=float(settings.get("rate", DEFAULT_RATE)),
+            models=settings.get("models"),
+            api_keys=settings.get("api_keys"),
+            errors=bool(tail.get("errors", True)),
+            latency_percentile=float(percentile) if percentile is not None else None,
+            latency_window=int(tail.get("latency_window", DEFAULT_LATENCY_WINDOW)),
+            latency_min_samples=int(tail.get("latency_min_samples", DEFAULT_LATENCY_MIN_SAMPLES)),
+            min_total_tokens=int(min_tokens) if min_tokens is not None else None,
+            middleware_modified=bool(tail.get("middleware_modified", False)),
+            rerouted=bool(tail.get("rerouted", True)),
+        )
+
+    def _rate_for_key(self, api_key: Optional[str]) -> Optional[float]:
+        if not api_key or not (self._key_raw or self._key_digests):
+            return None
+        if api_key in self._key_rates:
+            return self._key_rates[api_key]
+        rate = self._key_raw.get(api_key)
+        if rate is None and self._key_digests:
+            digest = hashlib.sha256(api_key.encode("utf-8")).hexdigest()
+            rate = next((r for prefix, r in self._key_digests if digest.startswith(prefix)), None)
+        if len(self._key_rates) >= _MAX_CACHED_KEYS:
+            self._key_rates.clear()
+        self._key_rates[api_key] = rate
+        return rate
+
+    def _rate_for_model(self, model: str) -> float:
+        rate = self._model_rates.get(model)
+        if rate is None:
+            rate = self._model_exact.get(model)
+            if rate is None:
+                rate = next((r for pattern, r in self._model_patterns if fnmatchcase(model, pattern)), self.rate)
+            if len(self._model_rates) >= _MAX_CACHED_MODELS:
+                self._model_rates.clear()
+            self._model_rates[model] = rate
+        return rate
+
+    def head_rate(self, model: str, api_key: Optional[str] = None) -> float:
+        rate = self._rate_for_key(api_key)
+        return rate if rate is not None else self._rate_for_model(model)
+
+    def _tail_reason(
+        self,
+        model: str,
+        latency_seconds: float,
+        error: Optional[str],
+        total_tokens: int,
+        middleware_modified: bool,
+        rerouted: bool,
+    ) -> Optional[str]:
+        reason = None
+        if error and self.errors:
+            reason = "error"
+        elif rerouted and self.rerouted:
+            reason = "rerouted"
+        elif self.min_total_tokens is not None and total_tokens >= self.min_total_tokens:
+            reason = "tokens"
+        elif middleware_modified and self.middleware_modified:
+            reason = "middleware_modified"
+        if self.latency_percentile is not None and not error:
+            with self._lock:
+                window = self._latency.get(model)
+                if window is None:
+                    if len(self._latency) >= _MAX_CACHED_MODELS:
+                        # Drop the model seen first; its percentile is rebuilt if it comes back
+                        del self._latency[next(iter(self._latency))]
+                    window = self._latency[model] = _LatencyWindow(self.latency_window)
+                threshold = window.threshold
+                window.add(latency_seconds, self.latency_percentile, self.latency_min_samples)
+            if reason is None and threshold is not None and latency_seconds > threshold:
+                reason = "latency"
+        return reason
+
+    def decide(
+        self,
+        model: str,
+        latency_seconds: float,
+        *,
+        api_key: Optional[str] = None,
+        error: Optional[str] = None,
+        input_tokens: Optional[int] = None,
+        output_tokens: Optional[int] = None,
+        middleware_modified: bool = False,
+        rerouted: bool = False,
+    ) -> Tuple[Optional[str], float]:
+        """Return (reason, head rate); reason is None when the trace should not be exported."""
+        total_tokens = (input_tokens or 0) + (output_tokens or 0)
+        rate = self.head_rate(model, api_key)
+        reason = self._tail_reason(model, latency_seconds, error, total_tokens, middleware_modified, rerouted)
+        if reason is None and rate > 0 and (rate >= 1 or random.random() < rate):
+            reason = "head"
+        with self._lock:
+            self.decisions += 1
+            if reason is None:
+                self.skipped += 1
+            else:
+                self.exported[reason] = self.exported.get(reason, 0) + 1
+        return reason, rate
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "decisions": self.decisions,
+                "exported": dict(self.exported),
+                "skipped": self.skipped,
+                "latency_thresholds_seconds": {
+                    model: round(w.threshold, 4) for model, w in self._latency.items() if w.threshold is not None
+                },
+            }
@@ -2,10 +2,11 @@
 FastAPI server: /v1/messages proxy to Anthropic with optional middleware from config.
 """
 
+import asyncio
 import json
-import traceback
+import time
 from datetime import datetime, timezone
-from typing import Any, Dict, Optional
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 
 
 def _parse_anthropic_sse_to_response(raw: bytes) -> Optional[Dict[str, Any]]:
@@ -56,9 +57,10 @@ def _parse_anthropic_sse_to_response(raw: bytes) -> Optional[Dict[str, Any]]:
 
 
 from fastapi import FastAPI, Request
-from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 
 from . import config
+from . import logsink
 from . import observability as obs
 from .anthropic_client import (
     AnthropicResponse,
@@ -67,8 +69,28 @@ from .anthropic_client import (
     call_anthropic,
     stream_to_anthropic,
 )
+from .blob_dedup import FILES_API_BETA, BlobDeduplicator, rejects_file, with_beta
+from .compression import BodyDecodeError, CompressionSettings, dumps_json, read_request_body
+from .pipeline import MiddlewareError, MiddlewarePipeline
+from .routing import SloRouter, error_from_event, error_type_from_exception
+from .sse import SseCoalescer, SseEvents, is_event
 
-middleware: Any = None
+
+
+class UpstreamStreamError(Exception):
+    """A stream that upstream ended with an SSE error event; passed to failure hooks."""
+
+    def __init__(self, error_type: str, message: str = "") -> None:
+        super().__init__(f"{error_type}: {message}" if message else error_type)
+        self.error_type = error_type
+
+
+middleware: Optional[MiddlewarePipeline] = None
+blob_dedup: Optional[BlobDeduplicator] = None
+compression = CompressionSettings()
+sse_coalescer: Optional[SseCoalescer] = None
+config_watcher: Optional[Any] = None
+slo_router: Optional[SloRouter] = None
 
 app = FastAPI(title="litelitellm", docs_url=None, redoc_url=None)
 
@@ -78,7 +100,7 @@ def _extract_request_context(request: Request):
     anthropic_version = request.headers.get("anthropic-version", "2023-06-01")
     _skip_headers = {
         "host", "connection", "content-length", "transfer-encoding",
-        "accept-encoding", "x-api-key", "anthropic-version", "content-type",
+        "accept-encoding", "content-encoding", "x-api-key", "anthropic-version", "content-type",
     }
     passthrough_headers: Dict[str, str] = {}
     for k, v in request.headers.items():
@@ -88,15 +110,85 @@ def _extract_request_context(request: Request):
     return api_key, anthropic_version, passthrough_headers, query_string
 
 
+def _encoded_response(request: Request, body: bytes, status_code: int = 200, media_type: str = "application/json") -> Response:
+    """Response with body compressed per Accept-Encoding when compression is enabled."""
+    body, encoding = compression.encode_response(body, request.headers.get("accept-encoding"))
+    headers = {"vary": "Accept-Encoding"} if compression.enabled else {}
+    if encoding:
+        headers["content-encoding"] = encoding
+    return Response(content=body, status_code=status_code, headers=headers, media_type=media_type)
+
+
+def _json_response(request: Request, content: Any, status_code: int = 200) -> Response:
+    if not compression.enabled:
+        return JSONResponse(content, status_code=status_code)
+    return _encoded_response(request, dumps_json(content), status_code)
+
+
 @app.get("/health")
 async def health():
     return {"status": "ok"}
 
 
+@app.on_event("startup")
+async def startup():
+    if config_watcher is not None:
+        config_watcher.start()
+    # Import httpx and build the upstream client off the event loop while we start serving
+    from .anthropic_client import _get_client
+    asyncio.get_running_loop().run_in_executor(None, _get_client)
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    if config_watcher is not None:
+        await config_watcher.stop()
+    if middleware is not None:
+        middleware.close()
+    logsink.get_sink().close()
+
+
+@app.get("/middleware/stats")
+async def middleware_stats():
+    return middleware.stats() if middleware is not None else {}
+
+
+@app.get("/stats")
+async def stats():
+    return {
+        "middleware": middleware.stats() if middleware is not None else {},
+        "blob_dedup": blob_dedup.stats() if blob_dedup is not None else None,
+        "reload": config_watcher.stats() if config_watcher is not None else None,
+        "logging": logsink.get_sink().stats(),
+        "sse_coalescing": sse_coalescer.stats() if sse_coalescer is not None else None,
+        "trace_sampling": obs.sampling_policy.stats() if obs.sampling_policy is not None else None,
+        "slo_routing": slo_router.stats() if slo_router is not None else None,
+    }
+
+
 @app.post("/v1/messages")
 async def messages_endpoint(request: Request):
+    # Capture the current generation: a hot reload swaps the module global, but this
+    # request (and its stream) keeps running on the pipeline it started with.
+    mw = middleware
+    if mw is None:
+        return await _proxy_messages(request, None)
+    mw.acquire()
+    stream_owns_release = False
+    try:
+        response = await _proxy_messages(request, mw)
+        stream_owns_release = isinstance(response, StreamingResponse)
+        return response
+    finally:
+        if not stream_owns_release:
+            mw.release()
+
+
+async def _proxy_messages(request: Request, mw: Optional[MiddlewarePipeline]):
     try:
-        body = await request.json()
+        body = json.loads(await read_request_body(request, compression.max_request_body_bytes))
+    except BodyDecodeError as e:
+        return JSONResponse({"error": {"type": "invalid_request_error", "message": str(e)}}, status_code=e.status_code)
     except Exception:
         return JSONResponse({"error": {"type": "invalid_request_error", "message": "Invalid JSON body"}}, status_code=400)
 
@@ -113,74 +205,147 @@ async def messages_endpoint(request: Request):
     orig_system = body.get("system")
     data = dict(body)
     middleware_modified = False
+    hook_timings: Dict[str, float] = {}
+    cache_hits: List[str] = []
 
-    if middleware is not None:
+    if mw is not None:
         try:
-            result = await middleware.async_pre_call_hook(
-                user_api_key_dict=None,
-                cache=None,
-                data=data,
-                call_type="anthropic_messages",
+            data = await mw.run_pre_call(data, hook_timings, cache_hits)
+        except MiddlewareError as e:
+            logsink.diag(f"Middleware rejected request: {e}")
+            if blob_dedup is not None:
+                _, body, _ = await blob_dedup.rewrite(body, client_api_key, anthropic_version, upload=False)
+            obs.record_request(
+                "/v1/messages",
+                body.get("model", ""),
+                (datetime.now(timezone.utc) - start_time).total_seconds(),
+                error=str(e),
+                middleware_timings_ms=hook_timings,
+                middleware_cache_hits=cache_hits,
+                request_body=body,
+                api_key=client_api_key,
             )
-            if result is not None:
-                new_tool_count = len(result.get("tools", []))
-                middleware_modified = (new_tool_count != orig_tool_count) or (result.get("system") is not orig_system)
-                data = result
-        except Exception as e:
-            print(f"[litelitellm] Middleware pre_call_hook error: {e}")
-            traceback.print_exc()
+            return JSONResponse({"error": {"type": "server_error", "message": str(e)}}, status_code=500)
+        middleware_modified = (len(data.get("tools", [])) != orig_tool_count) or (data.get("system") is not orig_system)
 
     if middleware_modified and config.ANTHROPIC_API_KEY:
         outbound_api_key = config.ANTHROPIC_API_KEY
         passthrough_headers = _strip_claude_code_headers(passthrough_headers)
     elif middleware_modified and not config.ANTHROPIC_API_KEY:
-        print("[litelitellm] WARNING: Middleware modified request but no ANTHROPIC_API_KEY set.")
+        logsink.diag("WARNING: Middleware modified request but no ANTHROPIC_API_KEY set.")
         outbound_api_key = client_api_key
     else:
         outbound_api_key = client_api_key
 
-    _request_api_key.set(outbound_api_key)
-    _request_passthrough_headers.set(passthrough_headers)
+    rerouted_from = None
+    if slo_router is not None:
+        routed_model = slo_router.route(data.get("model", ""), bool(is_stream))
+        if routed_model is not None:
+            rerouted_from = data.get("model", "")
+            data["model"] = routed_model
+
     request_id = data.pop("_skills_request_id", None)
     forward_data = {k: v for k, v in data.items() if k not in ("_skills_request_id",)}
+    logged_body = data
+    # What to send instead if upstream rejects the deduplicated request's file references
+    inline_retry: Optional[Tuple[Dict[str, Any], Dict[str, str]]] = None
+    if blob_dedup is not None:
+        inline_data = forward_data
+        forward_data, logged_body, deduped = await blob_dedup.rewrite(forward_data, outbound_api_key, anthropic_version)
+        if deduped:
+            inline_retry = (inline_data, passthrough_headers)
+            passthrough_headers = with_beta(passthrough_headers, FILES_API_BETA)
+
+    _request_api_key.set(outbound_api_key)
+    _request_passthrough_headers.set(passthrough_headers)
+    hook_kwargs: Dict[str, Any] = {"model": data.get("model", ""), "messages": data.get("messages", []), "stream": bool(is_stream)}
+    if request_id:
+        hook_kwargs["_skills_request_id"] = request_id
+    if mw is not None:
+        mw.on_pre_api_call(hook_kwargs["model"], hook_kwargs["messages"], hook_kwargs)
 
     if is_stream:
         async def stream_with_logging():
             err = None
+            completed = False
             chunks: list[bytes] = []
+            upstream_start = time.perf_counter()
+            ttft_ms: Optional[float] = None
+            # Anthropic reports upstream failures on a stream as an SSE error event, not an exception
+            upstream_error: Optional[str] = None
+            stream_error: Optional[UpstreamStreamError] = None
+            events = SseEvents()
             try:
-                async for chunk in stream_to_anthropic(forward_data, outbound_api_key, anthropic_version, passthrough_headers, query_string):
+                upstream = stream_to_anthropic(forward_data, outbound_api_key, anthropic_version, passthrough_headers, query_string)
+                if inline_retry is not None:
+                    upstream = _stream_inline_on_file_rejection(
+                        upstream, forward_data, inline_retry, outbound_api_key, anthropic_version, query_string,
+                    )
+                if sse_coalescer is not None:
+                    upstream = sse_coalescer.coalesce(upstream)
+                async for chunk in upstream:
+                    if upstream_error is None:
+                        # Scan whole events: reads (and so chunks) can split an event anywhere
+                        for event in events.feed(chunk):
+                            if is_event(event, b"event: error"):
+                                found = error_from_event(event)
+                                if found is not None:
+                                    upstream_error = found[0]
+                                    stream_error = UpstreamStreamError(*found)
+                                    break
+                            elif ttft_ms is None and slo_router is not None and is_event(event, b"event: content_block_delta"):
+                                ttft_ms = (time.perf_counter() - upstream_start) * 1000.0
                     chunks.append(chunk)
                     yield chunk
                 end_time = datetime.now(timezone.utc)
-                if middleware is not None and request_id:
-                    try:
-                        await middleware.async_log_success_event(
+                if stream_error is not None:
+                    if mw is not None and request_id:
+                        await mw.log_failure(
                             kwargs={"_skills_request_id": request_id},
-                            response_obj=None,
+                            response_obj=stream_error,
                             start_time=start_time,
                             end_time=end_time,
                         )
-                    except Exception:
-                        pass
-            except Exception as e:
-                err = str(e)
-                end_time = datetime.now(timezone.utc)
-                if middleware is not None and request_id:
-                    try:
-                        await middleware.async_log_failure_event(
+                    if mw is not None:
+                        mw.on_failure(hook_kwargs, stream_error, start_time, end_time)
+                else:
+                    completed = True
+                    if mw is not None and request_id:
+                        await mw.log_success(
                             kwargs={"_skills_request_id": request_id},
-                            response_obj=e,
+                            response_obj=None,
                             start_time=start_time,
                             end_time=end_time,
                         )
-                    except Exception:
-                        pass
+            except Exception as e:
+                err = str(e)
+                upstream_error = upstream_error or error_type_from_exception(e)
+                end_time = datetime.now(timezone.utc)
+                if mw is not None and request_id:
+                    await mw.log_failure(
+                        kwargs={"_skills_request_id": request_id},
+                        response_obj=e,
+                        start_time=start_time,
+                        end_time=end_time,
+                    )
+                if mw is not None:
+                    mw.on_failure(hook_kwargs, e, start_time, end_time)
                 yield f"event: error\ndata: {json.dumps({'error': {'type': 'server_error', 'message': err}})}\n\n".encode()
             finally:
                 end = datetime.now(timezone.utc)
+                if slo_router is not None and (completed or ttft_ms is not None or upstream_error is not None):
+                    slo_router.observe(data.get("model", ""), ttft_ms, upstream_error)
                 response_body = _parse_anthropic_sse_to_response(b"".join(chunks)) if chunks else None
                 usage = (response_body or {}).get("usage", {})
+                if mw is not None and completed:
+                    mw.on_success(
+                        hook_kwargs,
+                        AnthropicResponse(response_body) if response_body else None,
+                        start_time,
+                        end,
+                        data,
+                        stream=True,
+                    )
                 obs.record_request(
                     "/v1/messages",
                     data.get("model", ""),
@@ -188,34 +353,51 @@ async def messages_endpoint(request: Request):
                     input_tokens=usage.get("input_tokens"),
                     output_tokens=usage.get("output_tokens"),
                     middleware_modified=middleware_modified,
-                    error=err,
-                    request_body=data,
+                    middleware_timings_ms=hook_timings,
+                    middleware_cache_hits=cache_hits,
+                    error=err or (str(stream_error) if stream_error is not None else None),
+                    request_body=logged_body,
                     response_body=response_body,
+                    api_key=client_api_key,
+                    rerouted_from=rerouted_from,
                 )
+                if mw is not None:
+                    mw.release()
 
         return StreamingResponse(stream_with_logging(), media_type="text/event-stream")
 
     try:
-        raw_response = await call_anthropic(forward_data, outbound_api_key, anthropic_version, passthrough_headers, query_string)
+        try:
+            raw_response = await call_anthropic(forward_data, outbound_api_key, anthropic_version, passthrough_headers, query_string)
+        except Exception as e:
+            if inline_retry is None or not _rejects_file(e):
+                raise
+            blob_dedup.forget(forward_data)
+            raw_response = await call_anthropic(inline_retry[0], outbound_api_key, anthropic_version, inline_retry[1], query_string)
     except Exception as e:
         end_time = datetime.now(timezone.utc)
-        if middleware is not None and request_id:
-            try:
-                await middleware.async_log_failure_event(
-                    kwargs={"_skills_request_id": request_id},
-                    response_obj=e,
-                    start_time=start_time,
-                    end_time=end_time,
-                )
-            except Exception:
-                pass
+        if slo_router is not None:
+            slo_router.observe(data.get("model", ""), error_type=error_type_from_exception(e))
+        if mw is not None and request_id:
+            await mw.log_failure(
+                kwargs={"_skills_request_id": request_id},
+                response_obj=e,
+                start_time=start_time,
+                end_time=end_time,
+            )
+        if mw is not None:
+            mw.on_failure(hook_kwargs, e, start_time, end_time)
         obs.record_request(
             "/v1/messages",
             data.get("model", ""),
             (end_time - start_time).total_seconds(),
             middleware_modified=middleware_modified,
+            middleware_timings_ms=hook_timings,
+            middleware_cache_hits=cache_hits,
             error=str(e),
-            request_body=data,
+            request_body=logged_body,
+            api_key=client_api_key,
+            rerouted_from=rerouted_from,
         )
         error_msg = str(e)
         status = 502
@@ -228,56 +410,38 @@ async def messages_endpoint(request: Request):
                 pass
         return JSONResponse({"error": {"type": "server_error", "message": error_msg}}, status_code=status)
 
+    if slo_router is not None:
+        slo_router.observe(data.get("model", ""))
     response_obj = AnthropicResponse(raw_response)
 
-    if middleware is not None:
+    if mw is not None:
         try:
-            if hasattr(middleware, "async_should_run_agentic_loop"):
-                should_run, loop_ctx = await middleware.async_should_run_agentic_loop(
-                    response=response_obj,
-                    model=data.get("model", ""),
-                    messages=data.get("messages", []),
-                    tools=data.get("tools"),
-                    stream=False,
-                    custom_llm_provider="anthropic",
-                    kwargs={},
-                )
-            else:
-                should_run, loop_ctx = False, {}
-            if should_run and hasattr(middleware, "async_run_agentic_loop"):
-                loop_response = await middleware.async_run_agentic_loop(
-                    tools=loop_ctx,
-                    model=data.get("model", ""),
-                    messages=data.get("messages", []),
-                    response=response_obj,
-                    anthropic_messages_provider_config=None,
-                    anthropic_messages_optional_request_params={k: v for k, v in data.items() if k not in ("messages", "model")},
-                    logging_obj=None,
-                    stream=False,
-                    kwargs={},
-                )
-                if loop_response is not None:
-                    if hasattr(loop_response, "_data"):
-                        raw_response = loop_response._data
-                    elif hasattr(loop_response, "model_dump"):
-                        raw_response = loop_response.model_dump()
-                    else:
-                        raw_response = loop_response
+            loop_response = await mw.run_agentic_loop(response_obj, data)
+            if loop_response is not None:
+                if isinstance(loop_response, AnthropicResponse):
+                    raw_response = loop_response.to_dict()
+                elif hasattr(loop_response, "model_dump"):
+                    raw_response = loop_response.model_dump()
+                else:
+                    raw_response = loop_response
         except Exception as e:
-            print(f"[litelitellm] Agentic loop error: {e}")
-            traceback.print_exc()
+            logsink.diag(f"Agentic loop error: {e}", exc_info=True)
+
+    if raw_response is response_obj._data:
+        # Blocks added to response_obj.content in place only reach the dict here
+        raw_response = response_obj.to_dict()
 
     end_time = datetime.now(timezone.utc)
-    if middleware is not None and request_id:
-        try:
-            await middleware.async_log_success_event(
-                kwargs={"_skills_request_id": request_id},
-                response_obj=response_obj,
-                start_time=start_time,
-                end_time=end_time,
-            )
-        except Exception:
-            pass
+    if mw is not None and request_id:
+        await mw.log_success(
+            kwargs={"_skills_request_id": request_id},
+            response_obj=response_obj,
+            start_time=start_time,
+            end_time=end_time,
+        )
+    if mw is not None:
+        final_response = response_obj if raw_response is response_obj._data else AnthropicResponse(raw_response)
+        mw.on_success(hook_kwargs, final_response, start_time, end_time, data)
 
     usage = raw_response.get("usage") or {}
     obs.record_request(
@@ -287,10 +451,48 @@ async def messages_endpoint(request: Request):
         input_tokens=usage.get("input_tokens"),
         output_tokens=usage.get("output_tokens"),
         middleware_modified=middleware_modified,
-        request_body=data,
+        middleware_timings_ms=hook_timings,
+        middleware_cache_hits=cache_hits,
+        request_body=logged_body,
         response_body=raw_response,
+        api_key=client_api_key,
+        rerouted_from=rerouted_from,
     )
-    return JSONResponse(raw_response)
+    return _json_response(request, raw_response)
+
+
+def _rejects_file(e: BaseException) -> bool:
+    """Whether an upstream HTTP error refused a file_id the request referenced."""
+    response = getattr(e, "response", None)
+    if response is None:
+        return False
+    return rejects_file(error_type_from_exception(e), getattr(response, "text", "") or "")
+
+
+async def _stream_inline_on_file_rejection(
+    upstream: AsyncIterator[bytes],
+    forward_data: Dict[str, Any],
+    inline_retry: Tuple[Dict[str, Any], Dict[str, str]],
+    api_key: str,
+    anthropic_version: str,
+    query_string: str,
+) -> AsyncIterator[bytes]:
+    """Pass upstream through, unless it opens with an error refusing a file_id: then stream the inline request instead."""
+    it = upstream.__aiter__()
+    try:
+        first = await it.__anext__()
+    except StopAsyncIteration:
+        return
+    found = error_from_event(first)
+    if found is not None and rejects_file(*found):
+        await it.aclose()
+        blob_dedup.forget(forward_data)
+        async for chunk in stream_to_anthropic(inline_retry[0], api_key, anthropic_version, inline_retry[1], query_string):
+            yield chunk
+        return
+    yield first
+    async for chunk in it:
+        yield chunk
 
 
 @app.api_route("/v1/messages/{subpath:path}", methods=["GET", "POST", "PUT", "DELETE"])
@@ -309,11 +511,17 @@ async def messages_subpath_passthrough(subpath: str, request: Request):
     url = f"{config.ANTHROPIC_API_URL}/v1/messages/{subpath}"
     if query_string:
         url = f"{url}?{query_string}"
-    body = await request.body()
+    try:
+        body = await read_request_body(request, compression.max_request_body_bytes)
+    except BodyDecodeError as e:
+        return JSONResponse({"error": {"type": "invalid_request_error", "message": str(e)}}, status_code=e.status_code)
     from .anthropic_client import _get_client
     client = _get_client()
     resp = await client.request(method=request.method, url=url, headers=headers, content=body)
-    return JSONResponse(resp.json(), status_code=resp.status_code)
+    if not compression.enabled:
+        return JSONResponse(resp.json(), status_code=resp.status_code)
+    media_type = resp.headers.get("content-type", "application/json").split(";")[0]
+    return _encoded_response(request, resp.content, resp.status_code, media_type)
 
 
 def _strip_claude_code_headers(headers: Dict[str, str]) -> Dict[str, str]:
@@ -8,6 +8,8 @@ import sys
 import types
 from typing import Any
 
+from . import logsink
+
 
 class CustomLogger:
     """Minimal CustomLogger stub matching litellm's interface."""
@@ -83,4 +85,4 @@ def install_shim():
     sys.modules["litellm.litellm_core_utils"] = core_utils_mod
     sys.modules["litellm.litellm_core_utils.litellm_logging"] = logging_mod
 
-    print("[litelitellm] Shim installed - litellm modules shimmed")
+    logsink.diag("Shim installed - litellm modules shimmed")
@@ -0,0 +1,196 @@
+"""
+SSE re-framing: coalesce complete server-sent events into fewer, larger writes.
+
+Fast models produce one tiny upstream chunk per token; passing each through
+costs an ASGI send and a syscall. Everything up to and including the first
+content_block_delta is passed through as it arrives, so time-to-first-token is
+unchanged. After that, SseCoalescer buffers complete events and flushes when
+the buffer reaches max_bytes or the oldest buffered byte is max_delay old;
+error events and the end of the stream flush at once. Events are never split
+or reordered.
+
+This cuts writes (syscalls, TCP segments, client wakeups), not proxy CPU: the
+per-chunk upstream read and event framing remain, and measured CPU per token
+is about the same as passthrough. Tokens after the first can arrive up to
+max_delay later than without coalescing.
+
+Config (litelitellm_settings.sse_coalescing):
+  enabled: true
+  max_bytes: 16384
+  max_delay_ms: 10
+"""
+
+import asyncio
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+DEFAULT_MAX_BYTES = 16 * 1024
+DEFAULT_MAX_DELAY_MS = 10.0
+
+_EVENT_END = b"\n\n"
+_FIRST_DELTA = b"event: content_block_delta"
+_ERROR = b"event: error"
+
+
+class SseEvents:
+    """Reassembles complete SSE events from arbitrarily split chunks (the split can fall anywhere, even mid-header)."""
+
+    __slots__ = ("_tail",)
+
+    def __init__(self) -> None:
+        self._tail = b""
+
+    def feed(self, chunk: bytes) -> List[bytes]:
+        """The events completed by chunk, each without its blank-line terminator."""
+        data = self._tail + chunk if self._tail else chunk
+        end = data.rfind(_EVENT_END)
+        if end < 0:
+            self._tail = data
+            return []
+        self._tail = data[end + len(_EVENT_END):]
+        return data[:end].split(_EVENT_END)
+
+
+def is_event(event: bytes, name: bytes) -> bool:
+    """Whether a complete event (from SseEvents.feed) has the given event: line, e.g. b"event: error"."""
+    return event.lstrip(b"\r\n").startswith(name)
+
+
+class _StreamState:
+    """Buffer shared between the upstream pump task and the writer."""
+
+    __slots__ = ("buf", "ready", "done", "error", "waiter", "timer", "space")
+
+    def __init__(self) -> None:
+        self.buf = bytearray()
+        self.ready = False
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.waiter: Optional[asyncio.Future] = None
+        self.timer: Optional[asyncio.TimerHandle] = None
+        self.space: Optional[asyncio.Future] = None
+
+    def wake(self) -> None:
+        self.ready = True
+        if self.waiter is not None and not self.waiter.done():
+            self.waiter.set_result(None)
+
+    async def wait(self) -> None:
+        self.waiter = asyncio.get_running_loop().create_future()
+        try:
+            await self.waiter
+        finally:
+            self.waiter = None
+
+    def take(self) -> bytes:
+        out = bytes(self.buf)
+        self.buf.clear()
+        self.ready = False
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        if self.space is not None and not self.space.done():
+            self.space.set_result(None)
+        return out
+
+
+class SseCoalescer:
+    """Wraps an SSE byte stream; see module docstring."""
+
+    # The pump stops reading upstream once this many max_bytes are waiting for a slow client
+    BACKLOG_FACTOR = 4
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES, max_delay_ms: float = DEFAULT_MAX_DELAY_MS) -> None:
+        self.max_bytes = max_bytes
+        self.max_delay = max_delay_ms / 1000.0
+        self.streams = 0
+        self.chunks_in = 0
+        self.writes_out = 0
+
+    @classmethod
+    def from_settings(cls, settings: Dict[str, Any]) -> Optional["SseCoalescer"]:
+        """Build from the sse_coalescing settings section; None unless enabled."""
+        if not settings or not settings.get("enabled"):
+            return None
+        return cls(
+            max_bytes=int(settings.get("max_bytes", DEFAULT_MAX_BYTES)),
+            max_delay_ms=float(settings.get("max_delay_ms", DEFAULT_MAX_DELAY_MS)),
+        )
+
+    async def _pump(self, source: AsyncIterator[bytes], st: _StreamState) -> None:
+        """Read upstream and append complete events to st.buf; one timer per flush window, not per chunk."""
+        loop = asyncio.get_running_loop()
+        tail = b""
+        try:
+            async for chunk in source:
+                self.chunks_in += 1
+                if tail:
+                    chunk = tail + chunk
+                    tail = b""
+                if not chunk.endswith(_EVENT_END):
+                    cut = chunk.rfind(_EVENT_END)
+                    if cut < 0:
+                        tail = chunk
+                        continue
+                    cut += len(_EVENT_END)
+                    chunk, tail = chunk[:cut], chunk[cut:]
+                if not st.buf:
+                    st.timer = loop.call_later(self.max_delay, st.wake)
+                st.buf += chunk
+                if _ERROR in chunk or len(st.buf) >= self.max_bytes:
+                    st.wake()
+                if len(st.buf) >= self.max_bytes * self.BACKLOG_FACTOR:
+                    st.space = loop.create_future()
+                    await st.space
+            if tail:
+                st.buf += tail
+        except Exception as e:
+            st.error = e
+        finally:
+            st.done = True
+            st.wake()
+
+    async def coalesce(self, source: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+        self.streams += 1
+        it = source.__aiter__()
+        # Pass the prelude through as it arrives, in this task, so the first token costs no extra hop.
+        # The first delta is found on reassembled events: a read can split its event: line.
+        events = SseEvents()
+        async for chunk in it:
+            self.chunks_in += 1
+            self.writes_out += 1
+            yield chunk
+            if any(is_event(e, _FIRST_DELTA) for e in events.feed(chunk)):
+                break
+        else:
+            return
+        st = _StreamState()
+        pump = asyncio.get_running_loop().create_task(self._pump(it, st))
+        try:
+            while True:
+                if not st.ready and not st.done:
+                    await st.wait()
+                if st.buf:
+                    self.writes_out += 1
+                    yield st.take()
+                elif st.done:
+                    break
+            if st.error is not None:
+                raise st.error
+        finally:
+            if st.timer is not None:
+                st.timer.cancel()
+            if not pump.done():
+                pump.cancel()
+                try:
+                    await pump
+                except BaseException:
+                    pass
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "streams": self.streams,
+            "chunks_in": self.chunks_in,
+            "writes_out": self.writes_out,
+            "max_bytes": self.max_bytes,
+            "max_delay_ms": self.max_delay * 1000.0,
+        }
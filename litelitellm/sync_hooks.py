@@ -0,0 +1,116 @@
+"""
+Bounded thread pool for synchronous CustomLogger hooks.
+
+Middleware ported from LiteLLM often does its work in the sync logging methods
+(log_pre_api_call, log_success_event, ...). Calling those from the event loop
+would block every in-flight request, so they are handed to a small pool instead.
+Submissions never block: once every worker is busy and the queue is full, the
+call is dropped and counted.
+"""
+
+import inspect
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, FrozenSet
+
+from . import logsink
+from .shim import CustomLogger
+
+SYNC_HOOK_METHODS = ("log_pre_api_call", "log_success_event", "log_failure_event", "log_stream_event")
+
+DEFAULT_SYNC_HOOK_WORKERS = 4
+DEFAULT_SYNC_HOOK_QUEUE_SIZE = 256
+DEFAULT_SYNC_HOOK_TIMEOUT = 10.0
+
+
+def overridden_sync_methods(callback: Any) -> FrozenSet[str]:
+    """Names of SYNC_HOOK_METHODS the callback implements itself (not the no-op stub)."""
+    found = set()
+    for method in SYNC_HOOK_METHODS:
+        bound = getattr(callback, method, None)
+        if not callable(bound):
+            continue
+        fn = getattr(bound, "__func__", bound)
+        if fn is getattr(CustomLogger, method) or inspect.iscoroutinefunction(fn):
+            continue
+        found.add(method)
+    return frozenset(found)
+
+
+class SyncHookExecutor:
+    """
+    Runs sync hooks on a fixed number of worker threads with a bounded backlog.
+    A hook that outlives its timeout cannot be interrupted; it is counted and
+    reported, and keeps its slot until it returns so a stuck hook leads to drops
+    rather than unbounded thread or queue growth.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = DEFAULT_SYNC_HOOK_WORKERS,
+        max_queue: int = DEFAULT_SYNC_HOOK_QUEUE_SIZE,
+        timeout: float = DEFAULT_SYNC_HOOK_TIMEOUT,
+    ) -> None:
+        self.max_workers = max(1, int(max_workers))
+        self.max_queue = max(0, int(max_queue))
+        self.timeout = timeout
+        self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="litelitellm-hook")
+        self._slots = threading.BoundedSemaphore(self.max_workers + self.max_queue)
+        self._lock = threading.Lock()
+        self.submitted = 0
+        self.completed = 0
+        self.dropped = 0
+        self.errors = 0
+        self.timeouts = 0
+
+    def submit(self, name: str, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> bool:
+        """Queue fn(*args, **kwargs). Returns False (and counts a drop) if the backlog is full."""
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.dropped += 1
+            return False
+        with self._lock:
+            self.submitted += 1
+        try:
+            self._pool.submit(self._run, name, fn, args, kwargs)
+        except RuntimeError:
+            # Pool already shut down
+            self._slots.release()
+            return False
+        return True
+
+    def _run(self, name: str, fn: Callable[..., Any], args: tuple, kwargs: Dict[str, Any]) -> None:
+        t0 = time.perf_counter()
+        failed = False
+        try:
+            fn(*args, **kwargs)
+        except Exception as e:
+            failed = True
+            logsink.diag(f"Sync hook {name} error: {e}", exc_info=True)
+        finally:
+            elapsed = time.perf_counter() - t0
+            timed_out = self.timeout is not None and elapsed > self.timeout
+            with self._lock:
+                self.completed += 1
+                self.errors += failed
+                self.timeouts += timed_out
+            if timed_out:
+                logsink.diag(f"Sync hook {name} took {elapsed:.2f}s (timeout {self.timeout}s)")
+            self._slots.release()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "workers": self.max_workers,
+                "queue_size": self.max_queue,
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "in_flight": self.submitted - self.completed,
+                "dropped": self.dropped,
+                "errors": self.errors,
+                "timeouts": self.timeouts,
+            }
+
+    def shutdown(self) -> None:
+        self._pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,71 @@
+import asyncio
+import gzip
+import zlib
+
+import pytest
+
+from litelitellm.compression import BodyDecodeError, read_request_body
+
+
+class _Request:
+    def __init__(self, body: bytes, encoding: str, chunk_size: int = 7) -> None:
+        self.headers = {"content-encoding": encoding}
+        self._body = body
+        self._chunk_size = chunk_size
+
+    async def stream(self):
+        for i in range(0, len(self._body), self._chunk_size):
+            yield self._body[i:i + self._chunk_size]
+
+    async def body(self) -> bytes:
+        return self._body
+
+
+def _read(body: bytes, encoding: str, chunk_size: int = 7, max_bytes: int = 1 << 20) -> bytes:
+    return asyncio.run(read_request_body(_Request(body, encoding, chunk_size), max_bytes))
+
+
+def _status(body: bytes, encoding: str, **kwargs) -> int:
+    with pytest.raises(BodyDecodeError) as e:
+        _read(body, encoding, **kwargs)
+    return e.value.status_code
+
+
+PAYLOAD = b'{"model":"m","messages":[' + b'{"role":"user","content":"hello"},' * 200 + b"{}]}"
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 4096])
+def test_gzip_and_deflate(chunk_size):
+    assert _read(gzip.compress(PAYLOAD), "gzip", chunk_size) == PAYLOAD
+    assert _read(zlib.compress(PAYLOAD), "deflate", chunk_size) == PAYLOAD
+
+
+def test_identity_and_encoding_header_case():
+    assert _read(PAYLOAD, "identity") == PAYLOAD
+    assert _read(gzip.compress(PAYLOAD), " GZip ") == PAYLOAD
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 4096])
+def test_multi_member_gzip(chunk_size):
+    body = gzip.compress(b"hello ") + gzip.compress(b"world") + b"\0\0"
+    assert _read(body, "gzip", chunk_size) == b"hello world"
+
+
+def test_decoded_size_limit():
+    assert _read(gzip.compress(PAYLOAD), "gzip", max_bytes=len(PAYLOAD)) == PAYLOAD
+    assert _status(gzip.compress(PAYLOAD), "gzip", max_bytes=len(PAYLOAD) - 1) == 413
+    # A small bomb is stopped at the limit, across members too
+    assert _status(gzip.compress(b"\0" * (1 << 22)), "gzip", chunk_size=4096, max_bytes=1 << 20) == 413
+    assert _status(gzip.compress(b"a" * 600) * 2, "gzip", max_bytes=1000) == 413
+
+
+def test_unsupported_encoding():
+    assert _status(PAYLOAD, "br") == 415
+
+
+def test_corrupt_truncated_and_trailing():
+    body = gzip.compress(PAYLOAD)
+    assert _status(body[:-10], "gzip") == 400
+    assert _status(b"not gzip at all", "gzip") == 400
+    assert _status(body + b"junk", "gzip") == 400
+    assert _status(zlib.compress(PAYLOAD) + b"junk", "deflate") == 400
@@ -0,0 +1,137 @@
+import asyncio
+
+from litelitellm.memo import PreCallMemo
+from litelitellm.pipeline import Hook, MiddlewarePipeline
+
+
+def _store(memo, before, result):
+    key, encoded = memo.key(before)
+    return key, memo.store(key, dict(before), encoded, result)
+
+
+def test_apply_replays_set_and_removed_fields():
+    memo = PreCallMemo(["system"])
+    before = {"model": "m", "system": "s", "metadata": {"u": 1}, "messages": []}
+    result = dict(before, system="S:s", max_tokens=100)
+    del result["metadata"]
+    key, refused = _store(memo, before, result)
+    assert refused is None
+
+    later = {"model": "m", "system": "s", "metadata": {"u": 2}, "messages": [{"role": "user", "content": "hi"}]}
+    delta = memo.get(memo.key(later)[0])
+    assert delta is not None and delta.removed == ("metadata",)
+    out = PreCallMemo.apply(later, delta)
+    assert out == {"model": "m", "system": "S:s", "max_tokens": 100, "messages": later["messages"]}
+    assert "metadata" in later  # the input dict is left alone
+
+
+def test_apply_returns_fresh_copies():
+    memo = PreCallMemo(["tools"])
+    before = {"tools": []}
+    _store(memo, before, {"tools": [{"name": "t"}]})
+    delta = memo.get(memo.key(before)[0])
+    first = PreCallMemo.apply(before, delta)
+    first["tools"].append("mutated")
+    assert PreCallMemo.apply(before, delta)["tools"] == [{"name": "t"}]
+
+
+def test_unchanged_declared_field_is_not_stored():
+    memo = PreCallMemo(["system"])
+    before = {"system": "s", "model": "m"}
+    _store(memo, before, dict(before, system="s"))
+    assert memo.get(memo.key(before)[0]).set_json == "{}"
+
+
+def test_diff_refuses_per_request_and_undeclared_changes():
+    memo = PreCallMemo(["system"], max_refusals=10)
+    before = {"system": "s", "messages": [1]}
+    assert _store(memo, before, dict(before, _skills_request_id="x"))[1] == "per-request key _skills_request_id"
+    assert _store(memo, before, dict(before, messages=[1, 2]))[1] == "changes undeclared field messages"
+    assert _store(memo, before, dict(before, system=object()))[1] == "system is not JSON-serializable"
+    # An equal value under a new object is not a rewrite, and dropping an undeclared field is fine
+    assert _store(memo, before, dict(before, messages=[1]))[1] is None
+    assert _store(memo, before, {"system": "s"})[1] is None
+    assert memo.uncacheable == 3 and memo.disabled is None
+
+
+def test_refusals_in_a_row_disable():
+    memo = PreCallMemo(None, max_refusals=3)
+    for i in range(3):
+        assert memo.disabled is None
+        _store(memo, {"system": "s"}, {"system": "s", "_id": i})
+    assert memo.disabled.startswith("3 requests in a row could not be cached")
+
+
+def test_oversized_key_is_not_looked_up():
+    memo = PreCallMemo(None, max_key_bytes=100, max_refusals=2)
+    data = {"messages": ["x" * 200]}
+    assert memo.key(data)[0] is None
+    assert memo.oversized == 1 and memo.disabled is None
+    memo.key(data)
+    assert memo.disabled is not None and "pre_call_cache_max_key_bytes" in memo.disabled
+
+
+def test_lru_eviction_by_entries_and_bytes():
+    memo = PreCallMemo(["n"], max_entries=2)
+    for n in range(3):
+        _store(memo, {"n": n}, {"n": n, "x": n})
+    assert memo.evictions == 1
+    assert memo.get(memo.key({"n": 0})[0]) is None
+    assert memo.get(memo.key({"n": 2})[0]) is not None
+
+    memo = PreCallMemo(["n"], max_bytes=40)
+    _store(memo, {"n": 0}, {"n": 0, "x": "a" * 20})
+    _store(memo, {"n": 1}, {"n": 1, "x": "b" * 20})
+    assert memo.stats()["entries"] == 1 and memo.stats()["bytes"] <= 40
+    assert _store(memo, {"n": 2}, {"n": 2, "x": "c" * 50})[1] == "delta larger than pre_call_cache_bytes"
+
+
+def test_low_hit_rate_disables():
+    memo = PreCallMemo(["n"])
+    for _ in range(PreCallMemo.REVIEW_EVERY - 1):
+        assert memo.record_miss(1.0, 1.0) is None
+    assert memo.record_miss(1.0, 1.0).startswith("hit rate 0.0%")
+    assert memo.stats()["disabled"] is not None
+
+
+def test_net_loss_disables_and_saved_ms_goes_negative():
+    memo = PreCallMemo(["n"])
+    for i in range(PreCallMemo.REVIEW_EVERY):
+        # A cheap hook behind an expensive key: each hit costs more than the call it replaces
+        reason = memo.record_hit(2.0) if i % 2 else memo.record_miss(3.0, 0.1)
+    assert memo.saved_ms() < 0 and memo.stats()["saved_ms"] < 0
+    assert reason.startswith("it cost")
+
+
+def test_paying_memo_stays_enabled():
+    memo = PreCallMemo(["n"])
+    for i in range(PreCallMemo.REVIEW_EVERY * 2):
+        assert (memo.record_hit(0.1) if i % 2 else memo.record_miss(10.2, 10.0)) is None
+    assert memo.disabled is None and memo.saved_ms() > 0
+
+
+class _Counting:
+    litelitellm_depends_on = ["system"]
+
+    def __init__(self):
+        self.calls = 0
+
+    async def async_pre_call_hook(self, user_api_key_dict, cache, data, call_type):
+        self.calls += 1
+        data["system"] = "S:" + data["system"]
+        return data
+
+
+def test_pipeline_skips_hook_on_hit():
+    cb = _Counting()
+    pipeline = MiddlewarePipeline([Hook("c", cb, memo=PreCallMemo(["system"]))])
+
+    async def run(i):
+        hits = []
+        out = await pipeline.run_pre_call({"system": "x", "messages": [i]}, {}, hits)
+        return out, hits
+
+    (first, hits0), (second, hits1) = asyncio.run(run(0)), asyncio.run(run(1))
+    assert cb.calls == 1 and hits0 == [] and hits1 == ["c"]
+    assert first == {"system": "S:x", "messages": [0]}
+    assert second == {"system": "S:x", "messages": [1]}
@@ -0,0 +1,122 @@
+import pytest
+
+from litelitellm import routing
+from litelitellm.routing import SloRouter, SloRule
+
+
+class _Clock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    c = _Clock()
+    monkeypatch.setattr(routing.time, "monotonic", c)
+    return c
+
+
+def _router(**rule) -> SloRouter:
+    spec = dict(model="opus", fallback="sonnet", max_ttft_ms=4000, min_samples=3, hold_seconds=60, probe_rate=0)
+    spec.update(rule)
+    return SloRouter([SloRule(**spec)], ewma_alpha=0.5)
+
+
+def test_breach_needs_min_samples(clock):
+    router = _router()
+    router.observe("opus", ttft_ms=9000)
+    router.observe("opus", ttft_ms=9000)
+    assert router.route("opus", stream=True) is None
+    router.observe("opus", ttft_ms=9000)
+    assert router.route("opus", stream=True) == "sonnet"
+    assert router.switches == 1 and router.rerouted == {"opus": 1}
+
+
+def test_error_rate_breach_counts_only_configured_types(clock):
+    router = _router(max_ttft_ms=None, max_error_rate=0.2)
+    for _ in range(5):
+        router.observe("opus", error_type="invalid_request_error")
+    assert router.route("opus", stream=True) is None
+    for _ in range(3):
+        router.observe("opus", error_type="overloaded_error")
+    assert router.route("opus", stream=True) == "sonnet"
+
+
+def test_holds_before_recovering(clock):
+    router = _router()
+    for _ in range(3):
+        router.observe("opus", ttft_ms=9000)
+    clock.now += 30
+    for _ in range(5):
+        router.observe("opus", ttft_ms=100)
+    assert router.route("opus", stream=True) == "sonnet"
+    clock.now += 30
+    router.observe("opus", ttft_ms=100)
+    assert router.route("opus", stream=True) is None
+    assert router.switches == 2
+
+
+def test_recovery_needs_the_lower_threshold(clock):
+    router = _router()
+    for _ in range(3):
+        router.observe("opus", ttft_ms=9000)
+    clock.now += 60
+    # Under max_ttft_ms (4000) but over the default recover_ttft_ms (3000)
+    for _ in range(10):
+        router.observe("opus", ttft_ms=3500)
+    assert router.route("opus", stream=True) == "sonnet"
+    router.observe("opus", ttft_ms=1000)
+    assert router.route("opus", stream=True) is None
+
+
+def test_probes_reach_the_primary(clock, monkeypatch):
+    router = _router(probe_rate=0.5)
+    for _ in range(3):
+        router.observe("opus", ttft_ms=9000)
+    monkeypatch.setattr(routing.random, "random", lambda: 0.1)
+    assert router.route("opus", stream=True) is None
+    monkeypatch.setattr(routing.random, "random", lambda: 0.9)
+    assert router.route("opus", stream=True) == "sonnet"
+    assert router.probes == 1
+
+
+def test_forced_probe_with_zero_probe_rate(clock):
+    router = _router()
+    for _ in range(3):
+        router.observe("opus", ttft_ms=9000)
+    clock.now += 59
+    assert router.route("opus", stream=True) == "sonnet"
+    clock.now += 1
+    assert router.route("opus", stream=True) is None
+    # Only one forced probe per hold_seconds
+    assert router.route("opus", stream=True) == "sonnet"
+    assert router.probes == 1
+
+
+def test_streams_only_and_degraded_fallback(clock):
+    router = SloRouter([
+        SloRule("opus", "sonnet", max_ttft_ms=4000, min_samples=1, probe_rate=0, streams_only=True),
+        SloRule("sonnet", "haiku", max_ttft_ms=4000, min_samples=1, probe_rate=0),
+    ])
+    router.observe("opus", ttft_ms=9000)
+    assert router.route("opus", stream=False) is None
+    assert router.route("opus", stream=True) == "sonnet"
+    router.observe("sonnet", ttft_ms=9000)
+    assert router.route("opus", stream=True) is None
+
+
+def test_patterns_and_settings():
+    router = SloRouter.from_settings({"enabled": True, "rules": [{"model": "claude-opus-*", "fallback": "sonnet", "max_ttft_ms": 1}]})
+    assert router.rule_for("claude-opus-4-1").fallback == "sonnet"
+    assert router.rule_for("claude-haiku") is None
+    assert SloRouter.from_settings({"enabled": True}) is None
+    assert SloRouter.from_settings({"rules": [{"model": "a", "fallback": "b"}]}) is None
+
+
+@pytest.mark.parametrize("rate", [-0.1, 1.5])
+def test_probe_rate_is_validated(rate):
+    with pytest.raises(ValueError):
+        SloRule.from_dict({"model": "opus", "fallback": "sonnet", "probe_rate": rate})
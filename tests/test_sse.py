@@ -0,0 +1,115 @@
+import asyncio
+
+import pytest
+
+from litelitellm.sse import SseCoalescer, SseEvents, is_event
+
+
+def _event(name: str, data: str) -> bytes:
+    return f"event: {name}\ndata: {data}\n\n".encode()
+
+
+STREAM = (
+    _event("message_start", '{"type":"message_start"}')
+    + _event("content_block_start", '{"type":"content_block_start"}')
+    + b"".join(_event("content_block_delta", '{"text":"tok%d"}' % i) for i in range(200))
+    + _event("message_stop", '{"type":"message_stop"}')
+)
+
+
+async def _chunks(data: bytes, size: int, delay: float = 0.0):
+    for i in range(0, len(data), size):
+        if delay:
+            await asyncio.sleep(delay)
+        yield data[i:i + size]
+
+
+async def _collect(agen):
+    return [chunk async for chunk in agen]
+
+
+def test_events_reassembled_across_any_split():
+    for size in (1, 5, 13, len(STREAM)):
+        events, out = SseEvents(), []
+        for i in range(0, len(STREAM), size):
+            out += events.feed(STREAM[i:i + size])
+        assert len(out) == 203
+        assert is_event(out[0], b"event: message_start")
+        assert sum(is_event(e, b"event: content_block_delta") for e in out) == 200
+
+
+@pytest.mark.parametrize("size", [1, 9, 64, 4096])
+def test_output_is_byte_exact(size):
+    coalescer = SseCoalescer(max_bytes=256, max_delay_ms=5)
+    out = asyncio.run(_collect(coalescer.coalesce(_chunks(STREAM, size))))
+    assert b"".join(out) == STREAM
+    if size < 4096:
+        assert coalescer.writes_out < coalescer.chunks_in
+
+
+def test_unterminated_tail_is_kept():
+    data = STREAM + b"event: ping\ndata: {}"
+    out = asyncio.run(_collect(SseCoalescer().coalesce(_chunks(data, 50))))
+    assert b"".join(out) == data
+
+
+def test_error_event_flushes_without_waiting():
+    async def source():
+        yield _event("content_block_delta", "{}")
+        yield _event("content_block_delta", "{}")
+        yield _event("error", '{"type":"error"}')
+        await asyncio.sleep(3600)
+
+    async def main():
+        it = SseCoalescer(max_delay_ms=60_000).coalesce(source())
+        first = await it.__anext__()
+        flushed = await asyncio.wait_for(it.__anext__(), timeout=1)
+        await it.aclose()
+        return first, flushed
+
+    first, flushed = asyncio.run(main())
+    assert first == _event("content_block_delta", "{}")
+    assert flushed.endswith(_event("error", '{"type":"error"}'))
+
+
+def test_upstream_exception_propagates_after_buffered_data():
+    async def source():
+        async for chunk in _chunks(STREAM[:2000], 100):
+            yield chunk
+        raise ConnectionError("upstream went away")
+
+    async def main():
+        out = []
+        with pytest.raises(ConnectionError):
+            async for chunk in SseCoalescer(max_delay_ms=60_000).coalesce(source()):
+                out.append(chunk)
+        return out
+
+    out = asyncio.run(main())
+    delivered = b"".join(out)
+    assert STREAM[:2000].startswith(delivered) and delivered.endswith(b"\n\n")
+    assert len(delivered) > 2000 - 100
+
+
+def test_aclose_stops_the_pump_and_closes_upstream():
+    closed = asyncio.Event()
+
+    async def source():
+        try:
+            yield _event("content_block_delta", "{}")
+            while True:
+                yield _event("content_block_delta", "{}")
+                await asyncio.sleep(0.001)
+        finally:
+            closed.set()
+
+    async def main():
+        it = SseCoalescer(max_delay_ms=1).coalesce(source())
+        await it.__anext__()
+        await it.__anext__()
+        await it.aclose()
+        assert closed.is_set()
+        pending = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+        assert pending == []
+
+    asyncio.run(main())